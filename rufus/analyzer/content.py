@@ -1,11 +1,31 @@
 import logging
-import json
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import io
+import re
+import bisect
+import heapq
+import asyncio
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+import orjson
+import httpx
 import os
 from dotenv import load_dotenv
 
 from ..utils.error import RufusError, handle_error
+from ..utils.batch import run_batch
+from ..utils.cache import ResultCache, SemanticCache
+from ..utils.clients import retire_client
+from .embeddings import Embedder
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Paragraph and sentence boundaries used to split long page text into chunks
+CHUNK_BREAK = re.compile(r'\n\n|\. ')
+
+# The complete "scores" array at the start of a streamed response
+SCORES_FIELD = re.compile(r'"scores"\s*:\s*\[([^\]]*)\]')
 
 class ContentAnalyzer:
     """
@@ -31,16 +51,136 @@ class ContentAnalyzer:
         
         if self.llm_provider == 'openai':
             self.model = self.config.get('openai_model', 'gpt-4o-mini')
-            if self.api_key:
-                self.client = OpenAI(api_key=self.api_key)
-            else:
-                self.client = OpenAI()
+            
+            # One pooled HTTP client keeps connections alive across the LLM requests of an event loop,
+            # both are created on first use
+            self._http = None
+            self._client = None
+            self._client_loop = None
+            if not self.api_key:
                 self.logger.warning("No API key provided. Using env variables.")
         else:
             raise RufusError(f"Unsupported LLM provider: {self.llm_provider}")
+        
+        self.temperature = 0.1
+        
+        # Static prompt parts, built once and shared by every chunk request
+        self._sys_msg = {
+            "role": "system",
+            "content": "You are a content filtering assistant that determines relevance of web content. Return JSON only, no prose."
+        }
+        # JSON mode makes a response format description unnecessary
+        self._prompt_tmpl = (
+            "INSTRUCTIONS:\n%s\n\n"
+            "CONTENT:\n%s\n\n"
+            "TASK:\n"
+            "1. For each numbered chunk, rate its relevance to the instructions from 0.0 to 1.0.\n"
+            "2. Extract only the sections of each chunk that are directly relevant to the instructions, "
+            "for chunks rated at least %s.\n\n"
+            'OUTPUT: {"scores": [<0.0-1.0 for each chunk, in order>], '
+            '"results": [{"id": <chunk number>, "relevant_text": <relevant text as a plain string>}]}'
+        )
+        
+        # Limits the number of LLM requests in flight across all pages
+        self._llm_semaphore = None
+        
+        # Runs chunk splitting and embedding off the event loop during analyze
+        self._executor = None
+        
+        # Exact-match cache of chunk analyses
+        self.cache = ResultCache(self.config, namespace="rufus:relevance") if self.config.get('use_llm_cache', False) else None
+        
+        # Local embeddings for the semantic cache and the chunk prefilter,
+        # loaded on the first analysis that has instructions
+        self.embedder = None
+        self.semantic_cache = None
+        self._instruction_vectors = {}
+    
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """
+        LLM client, created on first use so importing Rufus does not load the OpenAI SDK.
+        
+        The pooled connections are bound to the event loop the client was created on,
+        so a new client is built when the running loop changes or after aclose().
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        
+        # A client assigned from outside has no HTTP client of ours and is kept as is
+        stale = self._http is not None and (self._http.is_closed or self._client_loop is not loop)
+        if self._client is None or stale:
+            from openai import AsyncOpenAI
+            
+            # Close the connection pool of the previous loop instead of orphaning it
+            if stale and not self._http.is_closed:
+                retire_client(self._http.aclose, self._client_loop, "LLM HTTP client")
+            
+            self._http = self._build_http_client()
+            if self.api_key:
+                self._client = AsyncOpenAI(api_key=self.api_key, http_client=self._http)
+            else:
+                self._client = AsyncOpenAI(http_client=self._http)
+            self._client_loop = loop
+        return self._client
+    
+    @client.setter
+    def client(self, client: "AsyncOpenAI") -> None:
+        self._client = client
+        self._http = None
+        self._client_loop = None
+    
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """
+        Build the HTTP client used for the LLM API.
+        
+        Returns:
+            httpx.AsyncClient with a connection pool sized by http_pool,
+            using HTTP/2 when the h2 package is installed
+        """
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            self.logger.debug("h2 not installed, using HTTP/1.1. Install with: pip install httpx[http2]")
+            http2 = False
+        
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(self.config.get('llm_timeout', 60.0)),
+            limits=httpx.Limits(
+                max_connections=self.config.get('http_pool', 100),
+                max_keepalive_connections=self.config.get('http_keepalive', 50)
+            )
+        )
+    
+    async def aclose(self) -> None:
+        """Close the HTTP connections of the LLM client and the cache."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._client = None
+        self._http = None
+        self._client_loop = None
+        
+        if self.cache:
+            await self.cache.aclose()
+    
+    def _setup_embeddings(self) -> None:
+        """Load the embedding model and the semantic cache if they are enabled and not loaded yet."""
+        if self.embedder is None and (self.config.get('use_semantic_cache', False) or self.config.get('use_embedding_prefilter', False)):
+            self.embedder = Embedder(self.config)
+        
+        # Similarity cache of chunk analyses
+        if self.semantic_cache is None and self.config.get('use_semantic_cache', False):
+            self.semantic_cache = SemanticCache(
+                self.config, self.embedder.dimension,
+                path=self.config.get('semantic_cache_path')
+            )
     
     @handle_error
-    def analyze(self, crawl_results: List[Dict[str, Any]], instructions: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def analyze(self, crawl_results: List[Dict[str, Any]], instructions: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Analyze crawled content for relevance to user instructions.
         Args:
@@ -58,10 +198,91 @@ class ContentAnalyzer:
             #If no instructions, return all content
             return crawl_results
         
-        relevant_content = []
+        self._setup_embeddings()
+        
+        if self.config.get('use_batch_api', False) and len(crawl_results) >= self.config.get('batch_api_min_pages', 20):
+            return await self.analyze_batch(crawl_results, instructions)
+        
+        # Assess all pages concurrently, the LLM calls are bounded by the semaphore
+        self._llm_semaphore = asyncio.Semaphore(self.config.get('max_concurrent_llm', 16))
+        with ThreadPoolExecutor(max_workers=self.config.get('analyze_workers', 16)) as executor:
+            self._executor = executor
+            try:
+                assessments = await asyncio.gather(*[self._assess_relevance(page, instructions) for page in crawl_results])
+            finally:
+                self._executor = None
+        
+        if self.semantic_cache:
+            self.semantic_cache.save()
+        
+        return self._collect_relevant(crawl_results, assessments)
+    
+    @handle_error
+    async def analyze_batch(self, crawl_results: List[Dict[str, Any]], instructions: str) -> List[Dict[str, Any]]:
+        """
+        Analyze crawled content through the OpenAI Batch API.
+        Cheaper than the online path but results can take up to 24 hours,
+        so it is meant for non-interactive crawls.
+        Args:
+            crawl_results: Results from the crawler
+            instructions: User instructions for content filtering
+        Returns:
+            List of relevant content with analysis metadata
+        """
+        self.logger.info(f"Submitting {len(crawl_results)} pages to the Batch API")
+        self._setup_embeddings()
+        
+        requests = []
+        page_batches = []
         
-        for page in crawl_results:
-            relevance_score, relevant_sections = self._assess_relevance(page, instructions)
+        for page_idx, page in enumerate(crawl_results):
+            batches = self._chunk_batches(page, instructions)
+            page_batches.append(batches)
+            
+            for batch_idx, chunks in enumerate(batches):
+                requests.append({
+                    'custom_id': f"page-{page_idx}-batch-{batch_idx}",
+                    'body': self._build_chunk_request(chunks, instructions)
+                })
+        
+        responses = await run_batch(
+            self.client, requests,
+            poll_interval=self.config.get('batch_poll_interval', 30)
+        )
+        
+        # Join the responses back to their pages using the custom_id
+        assessments = []
+        for page_idx, batches in enumerate(page_batches):
+            chunk_results = []
+            
+            for batch_idx, chunks in enumerate(batches):
+                custom_id = f"page-{page_idx}-batch-{batch_idx}"
+                body = responses.get(custom_id)
+                parsed = None
+                if body:
+                    # A malformed response only costs its own chunks, like a failed online request
+                    try:
+                        parsed = self._parse_chunk_results(body['choices'][0]['message']['content'], len(chunks))
+                    except (KeyError, IndexError, TypeError, AttributeError) as e:
+                        self.logger.error(f"Malformed batch response for {custom_id}: {str(e)}")
+                chunk_results.extend(parsed or [(0.0, None)] * len(chunks))
+            
+            assessments.append(self._score_chunks(chunk_results))
+        
+        return self._collect_relevant(crawl_results, assessments)
+    
+    def _collect_relevant(self, crawl_results: List[Dict[str, Any]], assessments: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Keep the pages that pass the relevance threshold and attach the analysis to them.
+        Args:
+            crawl_results: Results from the crawler
+            assessments: (relevance_score, relevant_sections) tuple for each page
+        Returns:
+            List of relevant content sorted by relevance
+        """
+        relevant_content = []  # (relevance_score, page) pairs
+        
+        for page, (relevance_score, relevant_sections) in zip(crawl_results, assessments):
             
             if relevance_score >= self.config.get('relevance_threshold', 0.3):
                 #Add relevance analysis to page metadata
@@ -74,29 +295,37 @@ class ContentAnalyzer:
                 if self.config.get('extract_relevant_only', True) and relevant_sections:
                     #Make sure relevant_sections contains only strings before joining
                     if relevant_sections and isinstance(relevant_sections, list):
-                        #Convert any non-string items to strings
-                        text_sections = []
-                        for section in relevant_sections:
+                        #Convert any non-string items to strings, writing them out as they are converted
+                        filtered_text = io.StringIO()
+                        for i, section in enumerate(relevant_sections):
+                            if i:
+                                filtered_text.write('\n\n')
                             if isinstance(section, str):
-                                text_sections.append(section)
+                                filtered_text.write(section)
                             elif isinstance(section, dict) and 'text' in section:
-                                text_sections.append(section['text'])
+                                filtered_text.write(section['text'])
                             elif isinstance(section, dict):
-                                text_sections.append(json.dumps(section))
+                                filtered_text.write(orjson.dumps(section).decode())
                             else:
-                                text_sections.append(str(section))         
-                        page['content']['filtered_text'] = '\n\n'.join(text_sections)
+                                filtered_text.write(str(section))
+                        page['content']['filtered_text'] = filtered_text.getvalue()
                     elif isinstance(relevant_sections, str):
                         page['content']['filtered_text'] = relevant_sections
                     else:
                         page['content']['filtered_text'] = str(relevant_sections)
-                relevant_content.append(page)
+                relevant_content.append((relevance_score, page))
 
-        relevant_content.sort(key=lambda x: x['metadata']['relevance']['score'], reverse=True)        
+        # Rank by score, keeping only the top pages when max_output_pages is set
+        top_k = self.config.get('max_output_pages')
+        if top_k:
+            ranked = heapq.nlargest(top_k, relevant_content, key=itemgetter(0))
+        else:
+            ranked = sorted(relevant_content, key=itemgetter(0), reverse=True)
+        
         self.logger.info(f"Found {len(relevant_content)} relevant pages")
-        return relevant_content
+        return [page for _, page in ranked]
     
-    def _assess_relevance(self, page: Dict[str, Any], instructions: str) -> tuple:
+    async def _assess_relevance(self, page: Dict[str, Any], instructions: str) -> tuple:
         """
         Assess the relevance of a page to the given instructions.
         Args:
@@ -106,6 +335,27 @@ class ContentAnalyzer:
             Tuple of (relevance_score, list_of_relevant_sections)
         """
         self.logger.debug(f"Assessing relevance of {page['url']}")
+        
+        # Splitting and embedding the page would otherwise stall the other pages' LLM calls
+        loop = asyncio.get_running_loop()
+        chunk_batches = await loop.run_in_executor(self._executor, self._chunk_batches, page, instructions)
+        
+        batches = await asyncio.gather(*[
+            self._analyze_chunks(chunks, instructions)
+            for chunks in chunk_batches
+        ])
+        
+        return self._score_chunks(result for batch_results in batches for result in batch_results)
+    
+    def _chunk_batches(self, page: Dict[str, Any], instructions: str) -> List[List[str]]:
+        """
+        Split the text of a page into chunks and group them into LLM requests.
+        Args:
+            page: Page content and metadata
+            instructions: User instructions
+        Returns:
+            List of chunk groups, each group is analyzed in a single request
+        """
         page_text = page['content']['text']
         
         # If the page is too long, split it into chunks for analysis
@@ -115,29 +365,63 @@ class ContentAnalyzer:
         else:
             chunks = [page_text]
         
+        chunks = [chunk for chunk in chunks if chunk.strip()]
+        
+        # Only send chunks that are semantically close to the instructions
+        if chunks and self.config.get('use_embedding_prefilter', False):
+            chunks = self._prefilter_chunks(chunks, instructions)
+        
+        # Send several chunks per LLM request to amortize the round-trip
+        batch_size = max(1, self.config.get('max_chunks_per_request', 4))
+        return [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+    
+    def _prefilter_chunks(self, chunks: List[str], instructions: str) -> List[str]:
+        """
+        Drop chunks whose embedding is not similar enough to the instructions.
+        Args:
+            chunks: Text chunks of a page
+            instructions: User instructions
+        Returns:
+            Chunks whose cosine similarity to the instructions exceeds embed_prefilter_threshold
+        """
+        if instructions not in self._instruction_vectors:
+            self._instruction_vectors[instructions] = self.embedder.encode([instructions])[0]
+        
+        # Embeddings are normalized, so one matrix-vector product gives the cosine similarities
+        similarities = self.embedder.encode(chunks) @ self._instruction_vectors[instructions]
+        threshold = self.config.get('embed_prefilter_threshold', 0.25)
+        
+        kept = [chunk for chunk, similarity in zip(chunks, similarities) if similarity > threshold]
+        self.logger.debug(f"Embedding prefilter kept {len(kept)} of {len(chunks)} chunks")
+        return kept
+    
+    def _score_chunks(self, chunk_results: List[tuple]) -> tuple:
+        """
+        Combine the chunk analysis results of a page into a page relevance score.
+        Args:
+            chunk_results: Iterable of (relevance_score, relevant_text) tuples, one per chunk
+        Returns:
+            Tuple of (relevance_score, list_of_relevant_sections)
+        """
         relevant_sections = []
-        chunk_scores = []
+        threshold = self.config.get('chunk_relevance_threshold', 0.5)
         
-        for chunk in chunks:
-            if not chunk.strip():
-                continue
-                
-            chunk_relevance, section_text = self._analyze_chunk(chunk, instructions)
-
-            if chunk_relevance >= self.config.get('chunk_relevance_threshold', 0.5):
-                chunk_scores.append(chunk_relevance)
+        # Running mean of the passing chunk scores, no list of scores is kept
+        count = 0
+        relevance_score = 0.0
+        
+        for chunk_relevance, section_text in chunk_results:
+            if chunk_relevance >= threshold:
+                count += 1
+                relevance_score += (chunk_relevance - relevance_score) / count
                 if section_text:
                     relevant_sections.append(section_text)
-        if chunk_scores:
-            relevance_score = sum(chunk_scores) / len(chunk_scores)
-        else:
-            relevance_score = 0.0
             
         return relevance_score, relevant_sections
     
-    def _analyze_chunk(self, text: str, instructions: str) -> tuple:
+    async def _analyze_chunk(self, text: str, instructions: str) -> tuple:
         """
-        Analyze a chunk of text for relevance to instructions using an LLM.
+        Analyze a single chunk of text for relevance to instructions using an LLM.
         
         Args:
             text: Text chunk to analyze
@@ -146,131 +430,305 @@ class ContentAnalyzer:
         Returns:
             Tuple of (relevance_score, extracted_relevant_text)
         """
-        # Build prompt for LLM
-        prompt = f"""
-        You are an AI assistant that analyzes web content to determine its relevance to specific instructions.
+        return (await self._analyze_chunks([text], instructions))[0]
+    
+    async def _analyze_chunks(self, chunks: List[str], instructions: str) -> List[tuple]:
+        """
+        Analyze several chunks of text for relevance to instructions in a single LLM request.
+        
+        Args:
+            chunks: Text chunks to analyze
+            instructions: User instructions
+            
+        Returns:
+            List of (relevance_score, extracted_relevant_text) tuples, one per chunk, in input order
+        """
+        results = [None] * len(chunks)
+        
+        # Serve repeated chunks from the cache
+        if self.cache:
+            keys = [self._cache_key(chunk, instructions) for chunk in chunks]
+            cached = await asyncio.gather(*[self.cache.get(key) for key in keys])
+            for i, value in enumerate(cached):
+                if value is not None:
+                    results[i] = tuple(value)
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        # Serve near-duplicate chunks from the semantic cache
+        if pending and self.semantic_cache:
+            # Embedding is CPU bound and would stall the other pages' LLM calls
+            loop = asyncio.get_running_loop()
+            vectors = await loop.run_in_executor(
+                self._executor, self.embedder.encode, [f"{instructions}\n{chunks[i]}" for i in pending]
+            )
+            for i, value in zip(pending, self.semantic_cache.lookup(vectors)):
+                if value is not None:
+                    results[i] = tuple(value)
+            
+            misses = [j for j, i in enumerate(pending) if results[i] is None]
+            vectors = vectors[misses]
+            pending = [pending[j] for j in misses]
+        
+        if not pending:
+            return results
+        
+        fresh_results = await self._request_chunks([chunks[i] for i in pending], instructions)
         
-        INSTRUCTIONS:
-        {instructions}
+        for i, result in zip(pending, fresh_results or [(0.0, None)] * len(pending)):
+            results[i] = result
+            
+            # Failed requests are not cached so they are retried next time
+            if self.cache and fresh_results:
+                await self.cache.set(keys[i], list(result))
         
-        CONTENT:
-        {text}
+        if self.semantic_cache and fresh_results:
+            self.semantic_cache.add(vectors, [list(result) for result in fresh_results])
         
-        TASK:
-        1. Determine if this content is relevant to the instructions on a scale of 0.0 to 1.0.
-        2. Extract only the sections that are directly relevant to the instructions.
-        3. Provide your response in JSON format with the following structure:
-        {{
-            "relevance_score": [score between 0.0 and 1.0],
-            "relevant_text": [extracted relevant text as a plain string, or null if none is relevant]
-        }}
+        return results
+    
+    async def _request_chunks(self, chunks: List[str], instructions: str) -> Optional[List[tuple]]:
         """
+        Send a group of chunks to the LLM.
         
+        Args:
+            chunks: Text chunks to analyze
+            instructions: User instructions
+            
+        Returns:
+            List of (relevance_score, extracted_relevant_text) tuples, or None if the request failed
+        """
         try:
             if self.llm_provider == 'openai':
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a content filtering assistant that determines relevance of web content."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.1,
-                    max_tokens=500
-                )
+                if self._llm_semaphore is None:
+                    self._llm_semaphore = asyncio.Semaphore(self.config.get('max_concurrent_llm', 16))
                 
-                # Get the content as a string from the message
-                content = response.choices[0].message.content
+                async with self._llm_semaphore:
+                    if self.config.get('stream_llm_responses', True):
+                        return await self._stream_chunks(chunks, instructions)
+                    
+                    response = await self.client.chat.completions.create(
+                        **self._build_chunk_request(chunks, instructions)
+                    )
                 
-                # Now we can use string methods on this content
-                try:
-                    # Try to parse it as JSON directly first
-                    try:
-                        result = json.loads(content)
-                        relevance_score = float(result.get('relevance_score', 0.0))
-                        relevant_text = result.get('relevant_text')
-                        
-                        # Ensure relevant_text is a string if it's not None
-                        if relevant_text is not None and not isinstance(relevant_text, str):
-                            if isinstance(relevant_text, list):
-                                # If it's a list, join the elements
-                                relevant_text = '\n\n'.join(str(item) for item in relevant_text)
-                            else:
-                                # Otherwise convert to string
-                                relevant_text = str(relevant_text)
-                        
-                        return relevance_score, relevant_text
-                    except json.JSONDecodeError:
-                        # If direct parsing fails, try to extract JSON from the text
-                        json_start = content.find('{')
-                        json_end = content.rfind('}') + 1
-                        
-                        if json_start >= 0 and json_end > json_start:
-                            json_content = content[json_start:json_end]
-                            result = json.loads(json_content)
-                            
-                            relevance_score = float(result.get('relevance_score', 0.0))
-                            relevant_text = result.get('relevant_text')
-                            
-                            # Ensure relevant_text is a string if it's not None
-                            if relevant_text is not None and not isinstance(relevant_text, str):
-                                if isinstance(relevant_text, list):
-                                    # If it's a list, join the elements
-                                    relevant_text = '\n\n'.join(str(item) for item in relevant_text)
-                                else:
-                                    # Otherwise convert to string
-                                    relevant_text = str(relevant_text)
-                            
-                            return relevance_score, relevant_text
-                        else:
-                            self.logger.warning("Could not find JSON in LLM response")
-                            return 0.0, None
-                        
-                except (json.JSONDecodeError, ValueError) as e:
-                    self.logger.error(f"Error parsing LLM response: {str(e)}")
-                    return 0.0, None
+                return self._parse_chunk_results(response.choices[0].message.content, len(chunks))
                 
         except Exception as e:
             self.logger.error(f"Error calling LLM API: {str(e)}")
-            return 0.0, None
+            return None
+    
+    async def _stream_chunks(self, chunks: List[str], instructions: str) -> Optional[List[tuple]]:
+        """
+        Stream the LLM response for a group of chunks and stop as soon as
+        the scores show that none of the chunks is relevant.
+        
+        Args:
+            chunks: Text chunks to analyze
+            instructions: User instructions
+            
+        Returns:
+            List of (relevance_score, extracted_relevant_text) tuples, or None if the response could not be parsed
+        """
+        stream = await self.client.chat.completions.create(
+            stream=True, **self._build_chunk_request(chunks, instructions)
+        )
+        threshold = self.config.get('chunk_relevance_threshold', 0.5)
+        content = []
+        scores = None
+        
+        try:
+            async for event in stream:
+                delta = event.choices[0].delta.content if event.choices else None
+                if not delta:
+                    continue
+                content.append(delta)
+                
+                if scores is not None:
+                    continue
+                
+                # The scores come first, check them once the array is complete
+                match = SCORES_FIELD.search(''.join(content))
+                if not match:
+                    continue
+                
+                try:
+                    scores = [float(score) for score in match.group(1).split(',') if score.strip()]
+                except ValueError:
+                    scores = []
+                    continue
+                
+                if len(scores) == len(chunks) and max(scores) < threshold:
+                    # Nothing passes, skip generating the relevant text
+                    self.logger.debug(f"Stopped LLM stream early, no chunk scored above {threshold}")
+                    return [(score, None) for score in scores]
+        finally:
+            await stream.close()
+        
+        return self._parse_chunk_results(''.join(content), len(chunks))
+    
+    def _cache_key(self, text: str, instructions: str) -> str:
+        """
+        Build the cache key of a chunk analysis.
+        
+        Args:
+            text: Text chunk
+            instructions: User instructions
+            
+        Returns:
+            Cache key
+        """
+        # Normalize whitespace so formatting differences still hit the cache
+        return ResultCache.make_key(self.model, self.temperature, instructions, ' '.join(text.split()))
+    
+    def _build_chunk_request(self, chunks: List[str], instructions: str) -> Dict[str, Any]:
+        """
+        Build the chat completion request analyzing a group of chunks.
+        
+        Args:
+            chunks: Text chunks to analyze
+            instructions: User instructions
+            
+        Returns:
+            Keyword arguments for the chat completion request
+        """
+        numbered_chunks = "\n\n".join(f"### CHUNK {i}\n{chunk}" for i, chunk in enumerate(chunks))
+        
+        # Build prompt for LLM
+        prompt = self._prompt_tmpl % (
+            instructions, numbered_chunks, self.config.get('chunk_relevance_threshold', 0.5)
+        )
+        
+        return {
+            'model': self.model,
+            'messages': [
+                self._sys_msg,
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': self.temperature,
+            'max_tokens': self.config.get('max_tokens_per_chunk', 500) * len(chunks),
+            'response_format': {"type": "json_object"}
+        }
+    
+    def _parse_chunk_results(self, content: str, num_chunks: int) -> Optional[List[tuple]]:
+        """
+        Parse the LLM response for a group of chunks.
+        
+        Args:
+            content: Message content returned by the LLM
+            num_chunks: Number of chunks in the request
+            
+        Returns:
+            List of (relevance_score, extracted_relevant_text) tuples, one per chunk, in input order,
+            or None if the response is not a JSON object
+        """
+        results = [(0.0, None)] * num_chunks
+        
+        # JSON mode guarantees the message content is a single JSON object
+        try:
+            result = orjson.loads(content)
+        except orjson.JSONDecodeError as e:
+            self.logger.error(f"Error parsing LLM response: {str(e)}")
+            return None
+        
+        if not isinstance(result, dict):
+            self.logger.error(f"Expected a JSON object in the LLM response, got {type(result).__name__}")
+            return None
+        
+        # Scores are listed in chunk order
+        scores = result.get('scores')
+        if not isinstance(scores, list):
+            scores = []
+        for chunk_id, score in enumerate(scores[:num_chunks]):
+            try:
+                results[chunk_id] = (float(score), None)
+            except (TypeError, ValueError):
+                continue
+        
+        # Map the entries back to their chunks by id
+        entries = result.get('results')
+        for entry in entries if isinstance(entries, list) else []:
+            try:
+                chunk_id = int(entry.get('id'))
+            except (TypeError, ValueError, AttributeError):
+                continue
+            
+            if not 0 <= chunk_id < num_chunks:
+                continue
+            
+            try:
+                relevance_score = float(entry.get('relevance_score', results[chunk_id][0]))
+            except (TypeError, ValueError):
+                relevance_score = results[chunk_id][0]
+            
+            results[chunk_id] = (relevance_score, self._coerce_text(entry.get('relevant_text')))
+        
+        return results
+    
+    def _coerce_text(self, relevant_text: Any) -> Optional[str]:
+        """
+        Ensure the relevant text returned by the LLM is a string if it's not None.
+        
+        Args:
+            relevant_text: Value of the 'relevant_text' field
+            
+        Returns:
+            The relevant text as a string, or None
+        """
+        if relevant_text is None or isinstance(relevant_text, str):
+            return relevant_text
+        
+        if isinstance(relevant_text, list):
+            # If it's a list, join the elements
+            return '\n\n'.join(str(item) for item in relevant_text)
+        
+        # Otherwise convert to string
+        return str(relevant_text)
     
     def _split_text(self, text: str, max_length: int) -> List[str]:
         """
-        Split text into chunks of approximately equal length.
+        Split text into chunks of at most max_length characters.
+        Chunks end at the last paragraph break that fits, then at the last sentence break,
+        and are hard-cut when neither fits.
         Args:
             text: Text to split
             max_length: Maximum chunk length
         Returns:
             List of text chunks
         """
-        paragraphs = text.split('\n\n')
+        # Find every candidate break in a single pass, offsets come out sorted
+        paragraph_ends, paragraph_starts = [], []
+        sentence_ends, sentence_starts = [], []
+        
+        for match in CHUNK_BREAK.finditer(text):
+            if match.group() == '\n\n':
+                paragraph_ends.append(match.start())
+                paragraph_starts.append(match.end())
+            else:
+                sentence_ends.append(match.start() + 1)  # Keep the '.'
+                sentence_starts.append(match.end())
         
         chunks = []
-        current_chunk = []
-        current_length = 0
-        
-        for paragraph in paragraphs:
-            # If a single paragraph is too long, split it further
-            if len(paragraph) > max_length:
-                sentences = paragraph.split('. ')
-                for sentence in sentences:
-                    if current_length + len(sentence) <= max_length:
-                        current_chunk.append(sentence)
-                        current_length += len(sentence) + 2  # Add 2 for '. '
-                    else:
-                        chunks.append('. '.join(current_chunk) + '.' if current_chunk else '')
-                        current_chunk = [sentence]
-                        current_length = len(sentence)
+        start = 0
+        text_length = len(text)
+        
+        while start < text_length:
+            limit = start + max_length
+            if limit >= text_length:
+                chunks.append(text[start:])
+                break
+            
+            # Binary search for the largest break that keeps the chunk within max_length
+            i = bisect.bisect_right(paragraph_ends, limit) - 1
+            if i >= 0 and paragraph_ends[i] > start:
+                end, next_start = paragraph_ends[i], paragraph_starts[i]
             else:
-                if current_length + len(paragraph) <= max_length:
-                    current_chunk.append(paragraph)
-                    current_length += len(paragraph) + 2  # Add 2 for '\n\n'
+                i = bisect.bisect_right(sentence_ends, limit) - 1
+                if i >= 0 and sentence_ends[i] > start:
+                    end, next_start = sentence_ends[i], sentence_starts[i]
                 else:
-                    chunks.append('\n\n'.join(current_chunk))
-                    current_chunk = [paragraph]
-                    current_length = len(paragraph)
-        
-        # Add the last chunk if it's not empty
-        if current_chunk:
-            chunks.append('\n\n'.join(current_chunk))
+                    end = next_start = limit
+            
+            chunks.append(text[start:end])
+            start = next_start
             
-        return chunks
\ No newline at end of file
+        return chunks
@@ -0,0 +1,114 @@
+import logging
+from typing import Any, List
+
+class Embedder:
+    """
+    Local sentence embedding model used for semantic caching of chunk analyses.
+    
+    Runs the model with sentence-transformers by default. With embedding_backend
+    set to 'onnx' it runs an exported (optionally INT8-quantized) ONNX model
+    with ONNX Runtime on the CPU instead.
+    """
+
+    def __init__(self, config: Any):
+        """
+        Initialize the embedding model.
+        
+        Args:
+            config: Configuration settings
+        """
+        self.config = config
+        self.logger = logging.getLogger("rufus.embeddings")
+        self.model_name = self.config.get('embedding_model', 'sentence-transformers/all-MiniLM-L6-v2')
+        self.backend = self.config.get('embedding_backend', 'torch')
+        self.batch_size = self.config.get('embedding_batch_size', 32)
+        
+        if self.backend == 'onnx':
+            self._setup_onnx()
+        else:
+            self._setup_torch()
+        
+        self.logger.info(f"Embedding model {self.model_name} loaded with {self.backend} backend ({self.dimension} dimensions)")
+
+    def _setup_torch(self):
+        """Load the model with sentence-transformers."""
+        try:
+            from sentence_transformers import SentenceTransformer
+            
+            self.model = SentenceTransformer(self.model_name)
+            self.dimension = self.model.get_sentence_embedding_dimension()
+        except ImportError:
+            self.logger.error("sentence-transformers not installed. Please install with: pip install sentence-transformers")
+            raise
+
+    def _setup_onnx(self):
+        """Load an exported ONNX model with ONNX Runtime."""
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError:
+            self.logger.error("ONNX Runtime not installed. Please install with: pip install onnxruntime transformers")
+            raise
+        
+        model_path = self.config.get('onnx_model_path')
+        if not model_path:
+            raise ValueError("onnx_model_path must point to an exported ONNX model when embedding_backend is 'onnx'")
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, texts: List[str]) -> Any:
+        """
+        Embed a list of texts.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            NumPy array of shape (len(texts), dimension) with L2-normalized rows
+        """
+        if self.backend == 'onnx':
+            return self._encode_onnx(texts)
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True)
+
+    def _encode_onnx(self, texts: List[str]) -> Any:
+        """Embed texts with the ONNX model, using mean pooling like sentence-transformers."""
+        import numpy as np
+        
+        batches = []
+        for i in range(0, len(texts), self.batch_size):
+            inputs = self.tokenizer(
+                texts[i:i + self.batch_size], padding=True, truncation=True, return_tensors='np'
+            )
+            feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self._input_names}
+            token_embeddings = self.session.run(None, feed)[0]
+            
+            # Average the token embeddings, ignoring padding
+            mask = inputs['attention_mask'][..., None].astype(token_embeddings.dtype)
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None))
+        
+        if not batches:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.concatenate(batches).astype(np.float32)
+
+def quantize_onnx_model(model_path: str, output_path: str) -> str:
+    """
+    Quantize the weights of an exported ONNX embedding model to INT8.
+    
+    Export the model first, e.g. with:
+    optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 out/
+    
+    Args:
+        model_path: Path of the exported FP32 model
+        output_path: Path to write the quantized model to
+    
+    Returns:
+        The output path, to be used as onnx_model_path
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
@@ -61,8 +61,8 @@ class RufusClient:
             self.logger.warning(f"No content found at {url}")
             return []
         
-        # Step 2: Analyze content for relevance to instructions
-        analyzed_content = await self.analyze_content(crawl_results, instructions)
+        # Step 2: Analyze content for relevance to instructions, without instructions every page is kept
+        analyzed_content = crawl_results if not instructions else await self.analyze_content(crawl_results, instructions)
         
         # Step 3: Synthesize the relevant content into structured documents
         documents = await self.synthesize_documents(analyzed_content, output_format)
@@ -72,11 +72,11 @@ class RufusClient:
     
     async def analyze_content(self, crawl_results, instructions):
         """Wrapper for the content analysis to support async"""
-        return self.analyzer.analyze(crawl_results, instructions)
+        return await self.analyzer.analyze(crawl_results, instructions)
     
     async def synthesize_documents(self, analyzed_content, output_format):
         """Wrapper for document synthesis to support async"""
-        return self.synthesizer.synthesize(analyzed_content, output_format=output_format)
+        return await self.synthesizer.synthesize_async(analyzed_content, output_format=output_format)
     
     @handle_error
     async def get_summary(self, documents: List[Dict[str, Any]]) -> str:
@@ -91,6 +91,14 @@ class RufusClient:
         """
         return self.synthesizer.generate_summary(documents)
     
+    async def aclose(self) -> None:
+        """
+        Close the HTTP connections kept open by the crawler, the analyzer and the synthesizer.
+        """
+        await self.crawler.aclose()
+        await self.analyzer.aclose()
+        await self.synthesizer.aclose()
+    
     def set_config(self, config: Dict[str, Any]) -> None:
         """
         Update the configuration settings.
@@ -1,7 +1,12 @@
 import logging
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 import asyncio
-from urllib.parse import urljoin
+
+# Subresources that are not needed to read the DOM and links
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet'}
+
+# Collects the absolute URL of every link, resolved by the browser
+EXTRACT_LINKS_JS = "() => Array.from(document.querySelectorAll('a[href]'), a => a.href).filter(Boolean)"
 
 class HeadlessBrowser:
     """
@@ -21,6 +26,8 @@ class HeadlessBrowser:
         self.browser_type = self.config.get('browser_type', 'playwright')
         self.browser = None
         self.context = None
+        self._page_pool = None
+        self._semaphore = None
         
     async def setup(self):
         """Initialize the browser based on configuration."""
@@ -60,6 +67,18 @@ class HeadlessBrowser:
                 user_agent=self.config.get('user_agent', 'Rufus/1.0')
             )
             
+            # Skip downloading images, fonts, media and stylesheets
+            if self.config.get('block_resources', True):
+                await self.context.route("**/*", self._route_request)
+            
+            # Pre-create pages that are reused across URLs instead of opening one per URL
+            self._page_pool = asyncio.Queue()
+            for _ in range(max(1, self.config.get('browser_pool_size', 8))):
+                self._page_pool.put_nowait(await self._new_page())
+            
+            # Bounds the number of pages loading at the same time
+            self._semaphore = asyncio.Semaphore(self.config.get('browser_concurrency', 8))
+            
             self.logger.info(f"Playwright {browser_name} browser initialized")
         except ImportError:
             self.logger.error("Playwright not installed. Please install with: pip install playwright")
@@ -102,21 +121,50 @@ class HeadlessBrowser:
             Dictionary with HTML content and links
         """
         if self.browser_type == 'playwright':
-            return await self._get_with_playwright(url)
+            async with self._semaphore:
+                return await self._get_with_playwright(url)
         else:
             return self._get_with_selenium(url)
     
+    async def get_pages_content(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get the fully rendered content of several pages concurrently.
+        
+        Args:
+            urls: URLs to fetch
+            
+        Returns:
+            List of dictionaries with HTML content and links, in the order of the URLs
+        """
+        if self.browser_type != 'playwright':
+            # A single WebDriver can only load one page at a time
+            return [self._get_with_selenium(url) for url in urls]
+        
+        return await asyncio.gather(*(self.get_page_content(url) for url in urls))
+    
+    async def _route_request(self, route) -> None:
+        """Abort requests for blocked resource types and let the rest through."""
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def _new_page(self):
+        """Create a Playwright page in the browser context."""
+        page = await self.context.new_page()
+        
+        # Set timeout
+        page.set_default_timeout(self.config.get('browser_timeout', 30000))
+        return page
+    
     async def _get_with_playwright(self, url: str) -> Dict[str, Any]:
         """Get page content using Playwright."""
+        # Borrow a page from the pool, waiting if all pages are in use
+        page = await self._page_pool.get()
+        
         try:
-            # Create a new page
-            page = await self.context.new_page()
-            
-            # Set timeout
-            page.set_default_timeout(self.config.get('browser_timeout', 30000))
-            
             # Navigate to URL
-            await page.goto(url, wait_until=self.config.get('playwright_wait_until', 'networkidle'))
+            await page.goto(url, wait_until=self.config.get('playwright_wait_until', 'domcontentloaded'))
             
             # Wait for content to load (optional additional wait)
             if self.config.get('browser_wait_for_selector'):
@@ -135,19 +183,10 @@ class HeadlessBrowser:
             # Get page content
             html = await page.content()
             
-            # Extract links if requested
+            # Extract links if requested, in one round-trip to the browser
             links = []
             if self.config.get('extract_links', True):
-                link_elements = await page.query_selector_all('a[href]')
-                for link in link_elements:
-                    href = await link.get_attribute('href')
-                    if href:
-                        # Convert to absolute URL
-                        absolute_url = urljoin(url, href)
-                        links.append(absolute_url)
-            
-            # Close the page
-            await page.close()
+                links = await page.evaluate(EXTRACT_LINKS_JS)
             
             return {
                 'html': html,
@@ -156,6 +195,22 @@ class HeadlessBrowser:
         except Exception as e:
             self.logger.error(f"Error fetching {url} with Playwright: {str(e)}")
             return {'html': '', 'links': []}
+        finally:
+            await self._release_page(page)
+    
+    async def _release_page(self, page) -> None:
+        """Reset a page and return it to the pool, replacing it if it is no longer usable."""
+        try:
+            await page.goto('about:blank')
+        except Exception as e:
+            self.logger.debug(f"Replacing unusable browser page: {str(e)}")
+            try:
+                await page.close()
+            except Exception:
+                pass
+            page = await self._new_page()
+        
+        self._page_pool.put_nowait(page)
     
     def _get_with_selenium(self, url: str) -> Dict[str, Any]:
         """Get page content using Selenium."""
@@ -174,14 +229,10 @@ class HeadlessBrowser:
             # Get page content
             html = self.browser.page_source
             
-            # Extract links if requested
+            # Extract links if requested, in one round-trip to the browser
             links = []
             if self.config.get('extract_links', True):
-                link_elements = self.browser.find_elements_by_tag_name('a')
-                for link in link_elements:
-                    href = link.get_attribute('href')
-                    if href:
-                        links.append(href)
+                links = self.browser.execute_script(f"return ({EXTRACT_LINKS_JS})();")
             
             return {
                 'html': html,
@@ -194,6 +245,10 @@ class HeadlessBrowser:
     async def close(self):
         """Close the browser and release resources."""
         if self.browser_type == 'playwright':
+            if self._page_pool:
+                while not self._page_pool.empty():
+                    await self._page_pool.get_nowait().close()
+                self._page_pool = None
             if self.context:
                 await self.context.close()
             if self.browser:
@@ -1,15 +1,61 @@
 import logging
+import os
+import hashlib
 import time
-from typing import List, Dict, Any, Set, Optional
+import functools
+from collections import deque
+from typing import List, Dict, Any, Set, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 import requests
 from bs4 import BeautifulSoup
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from .browser import HeadlessBrowser
 import aiohttp
+from aiolimiter import AsyncLimiter
 
+from ..utils.config import Config
 from ..utils.error import RufusError, handle_error
 from .parser import HTMLParser
+from .visited import VisitedSet
+from .results import CrawlResults
+
+# Content types parsed as HTML
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+try:
+    import xxhash
+    
+    def body_hash(data: bytes) -> int:
+        """Fast non-cryptographic hash of a page body."""
+        return xxhash.xxh64_intdigest(data)
+except ImportError:
+    def body_hash(data: bytes) -> bytes:
+        """Hash of a page body, used when xxhash is not installed."""
+        return hashlib.blake2b(data, digest_size=8).digest()
+
+_uvloop_installed = False
+
+def install_uvloop() -> bool:
+    """
+    Make uvloop the event loop of new asyncio loops, if it is installed.
+    Loops that are already running are not affected.
+    
+    Returns:
+        True if uvloop is in use
+    """
+    global _uvloop_installed
+    
+    if not _uvloop_installed:
+        try:
+            import uvloop
+            
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            _uvloop_installed = True
+        except ImportError:
+            logging.getLogger("rufus.crawler").debug("uvloop not installed, using the default event loop. Install with: pip install uvloop")
+    
+    return _uvloop_installed
 
 class Crawler:
     """
@@ -23,23 +69,81 @@ class Crawler:
         Args:
             config: Configuration settings
         """
-        self.config = config
         self.logger = logging.getLogger("rufus.crawler")
+        self.config = config
         self.parser = HTMLParser()
-        self.visited_urls = set()
+        self.visited_urls = VisitedSet(self.config)
         self.headers = {
             'User-Agent': config.get('user_agent', 'Rufus/1.0 (https://github.com/sabdulrahman/rufus)'),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
         }
+        # Per-host rate limiters, created for each crawl
+        self._limiters = {}
+        
+        # Hashes of the page bodies seen in the current crawl, mapped to their first URL
+        self._seen_bodies = {}
+        
+        # HTTP session reused across crawls to keep connections alive, created on first use
+        self._session = None
+        self._session_loop = None
+        
+        # Thread pool parsing pages off the event loop during async crawls
+        self._parse_pool = None
+        
+        # Run crawls created after this point on uvloop when it is installed
+        if config.get('use_uvloop', True):
+            install_uvloop()
+        
         # Add browser instance
         self.use_browser = config.get('use_browser', False)
         self.browser = None
         if self.use_browser:
             self.browser = HeadlessBrowser(config)        
     
+    @property
+    def config(self):
+        """Configuration settings."""
+        return self._config
+    
+    @config.setter
+    def config(self, config) -> None:
+        self._config = config
+        self._configure()
+    
+    def _configure(self) -> None:
+        """
+        Copy the settings used on the per-page path into attributes and precompute the link filter rules.
+        Runs whenever the configuration is assigned, so fetching and filtering do no config lookups.
+        """
+        self._request_timeout = self.config.get('request_timeout', 10)
+        self._client_timeout = aiohttp.ClientTimeout(total=self._request_timeout)
+        self._crawl_delay = float(self.config.get('crawl_delay', 1) or 0)
+        self._max_concurrent = self.config.get('max_concurrent_requests', 5)
+        self._per_host_rate = self.config.get('per_host_rate') or self._max_concurrent
+        self._html_parser = self.config.get('html_parser', 'lxml')
+        if self._html_parser == 'lxml':
+            try:
+                import lxml
+            except ImportError:
+                self.logger.debug("lxml not installed, parsing with html.parser. Install with: pip install lxml")
+                self._html_parser = 'html.parser'
+        self._save_html = bool(self.config.get('save_html', False))
+        self._xpath_links = bool(self.config.get('xpath_links', True))
+        self._max_page_bytes = self.config.get('max_page_bytes', 5000000)
+        self._dedupe_pages = bool(self.config.get('dedupe_pages', True))
+        self._parse_workers = self.config.get('parse_workers') or os.cpu_count() or 1
+        
+        self._stay_in_domain = bool(self.config.get('stay_in_domain', True))
+        
+        # A tuple of extensions for one str.endswith call and one regex for all ignore patterns
+        self._skip_extensions, self._ignore_re = Config.compile_url_matchers(
+            self.config.get('skip_extensions', ['.pdf', '.jpg', '.png', '.gif']),
+            self.config.get('ignore_patterns', [])
+        )
+    
     @handle_error
-    async def crawl(self, start_url: str, max_pages: int = 10, depth: int = 2) -> List[Dict[str, Any]]:
+    async def crawl(self, start_url: str, max_pages: int = 10, depth: int = 2) -> CrawlResults:
         """
         Crawl a website starting from the given URL.
         
@@ -49,7 +153,8 @@ class Crawler:
             depth: Maximum depth of nested links to follow
             
         Returns:
-            List of dictionaries containing page content and metadata
+            CrawlResults holding the content and metadata of each page,
+            which iterates and indexes like a list of page dictionaries
         """
         self.logger.info(f"Starting crawl at {start_url} with max_pages={max_pages} and depth={depth}")
         
@@ -58,7 +163,9 @@ class Crawler:
         if not parsed_url.scheme or not parsed_url.netloc:
             raise RufusError(f"Invalid URL: {start_url}")
         
-        self.visited_urls = set()
+        self.visited_urls = VisitedSet(self.config)
+        self._limiters = {}
+        self._seen_bodies = {}
         self.domain = parsed_url.netloc
         
         # Initialize browser if needed
@@ -75,21 +182,23 @@ class Crawler:
                     await self.browser.close()
         else:
             try:
-                return await self._sync_crawl(start_url, max_pages, depth)
+                # Run the blocking crawl off the event loop
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, self._sync_crawl, start_url, max_pages, depth)
             finally:
                 # Close browser if it was used
                 if self.use_browser:
                     await self.browser.close()
     
-    def _sync_crawl(self, start_url: str, max_pages: int, depth: int) -> List[Dict[str, Any]]:
+    def _sync_crawl(self, start_url: str, max_pages: int, depth: int) -> CrawlResults:
         """
         Synchronous version of the crawling algorithm.
         """
-        to_visit = [(start_url, 0)]  # (url, current_depth)
-        results = []
+        to_visit = deque([(start_url, 0)])  # (url, current_depth)
+        results = CrawlResults()
         
         while to_visit and len(results) < max_pages:
-            url, current_depth = to_visit.pop(0)
+            url, current_depth = to_visit.popleft()
             
             if url in self.visited_urls:
                 continue
@@ -98,14 +207,15 @@ class Crawler:
             
             try:
                 response = requests.get(url, headers=self.headers, 
-                                       timeout=self.config.get('request_timeout', 10))
+                                       timeout=self._request_timeout)
                 response.raise_for_status()
                 
-                # Respect robots.txt and rate limiting
-                time.sleep(self.config.get('crawl_delay', 1))
+                # Skip bodies identical to a page already crawled under another URL
+                if self._is_duplicate(response.content, url):
+                    continue
                 
-                # Parse the HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
+                # Parse the raw bytes so the encoding is detected by the native charset detector
+                soup = BeautifulSoup(response.content, self._html_parser)
                 
                 # Extract content
                 content = self.parser.extract_content(soup)
@@ -115,7 +225,7 @@ class Crawler:
                     'url': url,
                     'title': self.parser.extract_title(soup),
                     'content': content,
-                    'html': response.text if self.config.get('save_html', False) else None,
+                    'html': response.text if self._save_html else None,
                     'metadata': {
                         'depth': current_depth,
                         'status_code': response.status_code,
@@ -126,58 +236,73 @@ class Crawler:
                 
                 # If we haven't reached max depth, extract links and add to queue
                 if current_depth < depth:
-                    links = self.parser.extract_links(soup, base_url=url)
+                    links = self._extract_links(response.content, soup, url)
                     filtered_links = self._filter_links(links)
                     
-                    for link in filtered_links:
-                        if link not in self.visited_urls:
-                            to_visit.append((link, current_depth + 1))
+                    to_visit.extend(
+                        (link, current_depth + 1)
+                        for link in dict.fromkeys(filtered_links)
+                        if link not in self.visited_urls
+                    )
             
             except Exception as e:
                 self.logger.error(f"Error crawling {url}: {str(e)}")
         
         return results
     
-    async def _async_crawl(self, start_url: str, max_pages: int, depth: int) -> List[Dict[str, Any]]:
+    async def _async_crawl(self, start_url: str, max_pages: int, depth: int) -> CrawlResults:
         """
         Asynchronous version of the crawling algorithm for better performance.
         """
-        to_visit = [(start_url, 0)]  # (url, current_depth)
-        results = []
+        queue = asyncio.Queue()  # (url, current_depth)
+        results = CrawlResults()
         
         # Create a semaphore to limit concurrent requests
-        semaphore = asyncio.Semaphore(self.config.get('max_concurrent_requests', 5))
+        num_workers = self._max_concurrent
+        semaphore = asyncio.Semaphore(num_workers)
         
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            while to_visit and len(results) < max_pages:
-                # Process up to N URLs concurrently
-                batch = to_visit[:self.config.get('batch_size', 5)]
-                to_visit = to_visit[self.config.get('batch_size', 5):]
-                
-                # Create tasks for the batch
-                tasks = [self._fetch_and_parse(session, url, current_depth, semaphore) 
-                         for url, current_depth in batch if url not in self.visited_urls]
-                
-                # Mark URLs as visited
-                self.visited_urls.update([url for url, _ in batch])
-                
-                # Execute tasks concurrently
-                batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # Process results
-                for result in batch_results:
-                    if isinstance(result, Exception):
-                        self.logger.error(f"Error during async crawl: {str(result)}")
+        # Reuse the crawler session so connections survive across crawls
+        session = self._get_session()
+        
+        def claim(urls: List[str], current_depth: int) -> None:
+            # Mark URLs visited when they are queued, so each URL is queued at most once
+            for url in self.visited_urls.claim(urls):
+                queue.put_nowait((url, current_depth))
+        
+        claim([start_url], 0)
+        
+        async def worker():
+            # Each worker fetches one URL at a time, so a slow page only holds up its own worker
+            while True:
+                url, current_depth = await queue.get()
+                try:
+                    # Drain the queue without fetching once enough pages were collected
+                    if len(results) >= max_pages:
                         continue
                     
-                    if result:
+                    result = await self._fetch_and_parse(session, url, current_depth, semaphore)
+                    
+                    if result and len(results) < max_pages:
                         results.append(result['page_data'])
                         
                         # If we haven't reached max depth, add new links to queue
-                        if result['current_depth'] < depth:
-                            for link in result['links']:
-                                if link not in self.visited_urls:
-                                    to_visit.append((link, result['current_depth'] + 1))
+                        if current_depth < depth:
+                            claim(result['links'], current_depth + 1)
+                except Exception as e:
+                    self.logger.error(f"Error during async crawl: {str(e)}")
+                finally:
+                    queue.task_done()
+        
+        with ThreadPoolExecutor(max_workers=self._parse_workers) as parse_pool:
+            self._parse_pool = parse_pool
+            workers = [asyncio.create_task(worker()) for _ in range(max(1, num_workers))]
+            try:
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                self._parse_pool = None
         
         return results
     
@@ -185,6 +310,11 @@ class Crawler:
         """
         Fetch a URL and parse its content asynchronously.
         """
+        # Respect rate limiting before taking a slot, so waiting does not hold up other hosts
+        limiter = self._get_limiter(url)
+        if limiter is not None:
+            await limiter.acquire()
+        
         async with semaphore:
             try:
                 # Use headless browser if configured
@@ -192,44 +322,52 @@ class Crawler:
                     page_data = await self.browser.get_page_content(url)
                     html = page_data['html']
                     links = page_data['links']
-                    
-                    # Respect rate limiting
-                    await asyncio.sleep(self.config.get('crawl_delay', 1))
+                    status_code = 200  # Browser always returns 200 if successful
                 else:
                     # Use standard HTTP request
-                    async with session.get(url, timeout=self.config.get('request_timeout', 10)) as response:
-                        if response.status != 200:
+                    async with session.get(url, timeout=self._client_timeout) as response:
+                        # Give up on errors before any of the body is read, redirects are already followed
+                        if response.status >= 400:
                             self.logger.warning(f"Received status code {response.status} for {url}")
                             return None
+                        status_code = response.status
                         
-                        # Respect rate limiting
-                        await asyncio.sleep(self.config.get('crawl_delay', 1))
+                        # Skip bodies announced as larger than max_page_bytes
+                        if self._max_page_bytes and response.content_length and response.content_length > self._max_page_bytes:
+                            self.logger.warning(f"Skipping {url}, content length {response.content_length} exceeds {self._max_page_bytes} bytes")
+                            return None
                         
-                        # Get the HTML content
-                        html = await response.text()
+                        # Skip non-HTML responses before reading their body
+                        content_type = response.headers.get('Content-Type', '')
+                        if content_type and not content_type.lower().startswith(HTML_CONTENT_TYPES):
+                            self.logger.debug(f"Skipping {url} with content type {content_type}")
+                            return None
+                        
+                        # Get the raw HTML, the parser detects its encoding
+                        html = await self._read_body(response, url)
                         links = None  # Will be extracted by parser
                 
-                # Parse the HTML
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Extract content
-                content = self.parser.extract_content(soup)
+                # Skip bodies identical to a page already crawled under another URL
+                if self._is_duplicate(html, url):
+                    return None
                 
-                # Extract links if not already extracted by browser
-                if links is None:
-                    links = self.parser.extract_links(soup, base_url=url)
+                # Parse in the thread pool, so other fetches keep running meanwhile
+                loop = asyncio.get_running_loop()
+                title, content, links, html = await loop.run_in_executor(
+                    self._parse_pool, self._parse_sync, html, url, links
+                )
                 
                 filtered_links = self._filter_links(links)
                 
                 return {
                     'page_data': {
                         'url': url,
-                        'title': self.parser.extract_title(soup),
+                        'title': title,
                         'content': content,
-                        'html': html if self.config.get('save_html', False) else None,
+                        'html': html if self._save_html else None,
                         'metadata': {
                             'depth': current_depth,
-                            'status_code': 200,  # Browser always returns 200 if successful
+                            'status_code': status_code,
                             'content_type': 'text/html',  # Assuming HTML content
                             'timestamp': time.time(),
                             'rendered': self.use_browser  # Flag to indicate if JS was rendered
@@ -243,6 +381,149 @@ class Crawler:
                 self.logger.error(f"Error fetching {url}: {str(e)}")
                 return None
     
+    def _parse_sync(self, html, url: str, links: Optional[List[str]] = None) -> Tuple[str, Dict[str, Any], List[str], Any]:
+        """
+        Parse a page and extract its title, content and links. CPU-bound, run in the parse pool.
+        
+        Args:
+            html: HTML of the page, as bytes or text
+            url: URL of the page
+            links: Links already extracted by the browser, or None to extract them from the HTML
+            
+        Returns:
+            Tuple of title, content, links and the HTML, decoded to text if it is saved
+        """
+        soup = BeautifulSoup(html, self._html_parser)
+        
+        content = self.parser.extract_content(soup)
+        
+        # Extract links if not already extracted by browser
+        if links is None:
+            links = self._extract_links(html, soup, url)
+        
+        if isinstance(html, bytes) and self._save_html:
+            html = html.decode(soup.original_encoding or 'utf-8', errors='replace')
+        
+        return self.parser.extract_title(soup), content, links, html
+    
+    def _get_limiter(self, url: str) -> Optional[AsyncLimiter]:
+        """
+        Get the rate limiter of the host of a URL.
+        
+        Args:
+            url: URL about to be fetched
+            
+        Returns:
+            Token bucket allowing per_host_rate requests per crawl_delay seconds,
+            or None if there is no crawl delay
+        """
+        if not self._crawl_delay:
+            return None
+        
+        host = self._netloc(url)
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = self._limiters[host] = AsyncLimiter(self._per_host_rate, self._crawl_delay)
+        return limiter
+    
+    def _is_duplicate(self, html, url: str) -> bool:
+        """
+        Check whether a page body was already seen in this crawl, remembering it if not.
+        
+        Args:
+            html: Body of the page, as bytes or text
+            url: URL of the page
+            
+        Returns:
+            True if an identical body was crawled before under another URL
+        """
+        if not self._dedupe_pages or not html:
+            return False
+        
+        if isinstance(html, str):
+            html = html.encode('utf-8', errors='replace')
+        
+        digest = body_hash(html)
+        first_url = self._seen_bodies.setdefault(digest, url)
+        if first_url != url:
+            self.logger.debug(f"Skipping {url}, same content as {first_url}")
+            return True
+        return False
+    
+    async def _read_body(self, response: aiohttp.ClientResponse, url: str) -> bytes:
+        """
+        Read a response body, stopping at max_page_bytes.
+        
+        Args:
+            response: Response to read
+            url: URL of the response
+            
+        Returns:
+            The body, truncated to max_page_bytes
+        """
+        max_bytes = self._max_page_bytes
+        body = bytearray()
+        
+        async for chunk in response.content.iter_chunked(65536):
+            body += chunk
+            if max_bytes and len(body) >= max_bytes:
+                self.logger.warning(f"Truncated {url} to {max_bytes} bytes")
+                del body[max_bytes:]
+                break
+        
+        return bytes(body)
+    
+    def _extract_links(self, html, soup: BeautifulSoup, url: str) -> List[str]:
+        """
+        Extract the links of a page, reading the hrefs straight from the HTML with selectolax or lxml when possible.
+        
+        Args:
+            html: HTML of the page, as bytes or text
+            soup: BeautifulSoup object of the page, used as a fallback
+            url: URL of the page
+            
+        Returns:
+            List of absolute URLs
+        """
+        links = None
+        if self._xpath_links:
+            links = self.parser.extract_links_from_html(html, base_url=url)
+        
+        if links is None:
+            links = self.parser.extract_links(soup, base_url=url)
+        return links
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the HTTP session, creating it on first use.
+        
+        Returns:
+            aiohttp session with a connection pool sized by max_connections and max_per_host
+        """
+        loop = asyncio.get_running_loop()
+        
+        # A session is bound to the event loop it was created on
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.get('max_connections', 200),
+                limit_per_host=self.config.get('max_per_host', 20),
+                ttl_dns_cache=self.config.get('dns_cache_ttl', 300),
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+            self._session_loop = loop
+        
+        return self._session
+    
+    async def aclose(self) -> None:
+        """
+        Close the HTTP session and release its connections.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+    
     def _filter_links(self, links: List[str]) -> List[str]:
         """
         Filter links to ensure they are valid and within the same domain.
@@ -254,28 +535,47 @@ class Crawler:
             Filtered list of links
         """
         filtered_links = []
+        stay_in_domain = self._stay_in_domain
+        skip_extensions = self._skip_extensions
+        ignore_re = self._ignore_re
         
         for link in links:
-            parsed = urlparse(link)
-            
             # Check if link is within the same domain, if stay_in_domain is True
-            if self.config.get('stay_in_domain', True) and parsed.netloc != self.domain:
+            if stay_in_domain and self._netloc(link) != self.domain:
                 continue
             
             # Skip URLs with irrelevant file extensions
-            if any(link.endswith(ext) for ext in self.config.get('skip_extensions', ['.pdf', '.jpg', '.png', '.gif'])):
+            if skip_extensions and link.endswith(skip_extensions):
                 continue
                 
             # Skip URLs containing ignore patterns
-            if any(pattern in link for pattern in self.config.get('ignore_patterns', [])):
+            if ignore_re is not None and ignore_re.search(link):
                 continue
                 
             filtered_links.append(link)
             
         return filtered_links
     
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _netloc(link: str) -> str:
+        """
+        Get the network location of a link. Cached, as navigation links recur on every page.
+        
+        Args:
+            link: Absolute URL
+            
+        Returns:
+            Network location of the URL
+        """
+        if link.startswith(('http://', 'https://')):
+            # Everything between '//' and the next '/', '?' or '#'
+            netloc = link.split('/', 3)[2]
+            return netloc.split('?', 1)[0].split('#', 1)[0]
+        return urlparse(link).netloc
+    
     def reset(self) -> None:
         """
         Reset the crawler state.
         """
-        self.visited_urls = set()
\ No newline at end of file
+        self.visited_urls = VisitedSet(self.config)
\ No newline at end of file
@@ -1,42 +1,73 @@
 import logging
-from typing import Dict, List, Set, Optional
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup, NavigableString, Tag
+import copy
+import re
+from typing import Dict, List, Set, Optional, Any, Iterable
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from bs4 import BeautifulSoup, Tag
+
+# Heading levels, in order
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# Semantic elements holding the main content, in order of preference
+CONTENT_TAGS = ('main', 'article', 'section')
+
+# Elements whose content starts on a new line in the clean text
+LINE_BREAK_TAGS = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'tr', 'br']
+
+# Whitespace around line breaks, including blank lines
+BLANK_LINES = re.compile(r'\s*\n\s*')
+
+# Links that do not point to a page
+SKIP_LINK_PREFIXES = ('#', 'javascript:', 'mailto:', 'tel:', 'data:')
+
+try:
+    # Lexbor-based parser whose CSS queries run in C, preferred for reading links
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
 
 class HTMLParser:
     """
     HTML parser for extracting content and links from web pages.
     """
     
-    def __init__(self):
-        """
-        Initialize the HTML parser.
-        """
-        self.logger = logging.getLogger("rufus.parser")
-        
-        # Define elements that typically contain the main content
-        self.content_tags = {
-            'article', 'main', 'section', 'div', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-            'ul', 'ol', 'li', 'table', 'tr', 'td', 'th'
-        }
-        
-        # Define elements to skip when extracting content
-        self.skip_tags = {
-            'script', 'style', 'noscript', 'iframe', 'svg', 'nav', 'footer', 'header', 
-            'aside', 'form', 'button', 'input', 'img'
-        }
-        
-        # Define common ids and classes for content areas
-        self.content_identifiers = {
-            'id': {'content', 'main', 'article', 'post', 'main-content', 'page-content'},
-            'class': {'content', 'article', 'post', 'main', 'main-content', 'page-content'}
-        }
-        
-        # Define common ids and classes for areas to skip
-        self.skip_identifiers = {
-            'id': {'header', 'footer', 'sidebar', 'menu', 'nav', 'navigation', 'comments', 'advertisement'},
-            'class': {'header', 'footer', 'sidebar', 'menu', 'nav', 'navigation', 'comments', 'ad', 'advertisement'}
-        }
+    # The matching rules are the same for every parser, so they are built once with the class
+    logger = logging.getLogger("rufus.parser")
+    
+    # Define elements that typically contain the main content
+    content_tags = frozenset({
+        'article', 'main', 'section', 'div', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+        'ul', 'ol', 'li', 'table', 'tr', 'td', 'th'
+    })
+    
+    # Define elements to skip when extracting content
+    skip_tags = frozenset({
+        'script', 'style', 'noscript', 'iframe', 'svg', 'nav', 'footer', 'header', 
+        'aside', 'form', 'button', 'input', 'img'
+    })
+    
+    # Define common ids and classes for content areas
+    content_identifiers = {
+        'id': frozenset({'content', 'main', 'article', 'post', 'main-content', 'page-content'}),
+        'class': frozenset({'content', 'article', 'post', 'main', 'main-content', 'page-content'})
+    }
+    
+    # Single CSS selector matching every main content candidate
+    _content_selector = ', '.join(
+        list(CONTENT_TAGS)
+        + [f'[id="{value}"]' for value in sorted(content_identifiers['id'])]
+        + [f'.{value}' for value in sorted(content_identifiers['class'])]
+    )
+    
+    # Define common ids and classes for areas to skip
+    skip_identifiers = {
+        'id': frozenset({'header', 'footer', 'sidebar', 'menu', 'nav', 'navigation', 'comments', 'advertisement'}),
+        'class': frozenset({'header', 'footer', 'sidebar', 'menu', 'nav', 'navigation', 'comments', 'ad', 'advertisement'})
+    }
+    
+    # Used for set intersection checks against element attributes
+    _skip_ids = skip_identifiers['id']
+    _skip_classes = skip_identifiers['class']
     
     def extract_title(self, soup: BeautifulSoup) -> str:
         """
@@ -75,13 +106,10 @@ class HTMLParser:
             # If no main content area is found, use the body
             main_content = soup.body or soup
         
-        # Extract structured content
+        # Extract structured content, headings, paragraphs, lists and tables come from a single walk
         structured_content = {
             'title': self.extract_title(soup),
-            'headings': self._extract_headings(main_content),
-            'paragraphs': self._extract_paragraphs(main_content),
-            'lists': self._extract_lists(main_content),
-            'tables': self._extract_tables(main_content),
+            **self._walk_once(main_content),
             'text': self._extract_clean_text(main_content)
         }
         
@@ -98,27 +126,73 @@ class HTMLParser:
         Returns:
             List of absolute URLs
         """
-        links = []
+        return self._normalize_links((a_tag['href'] for a_tag in soup.find_all('a', href=True)), base_url)
+    
+    def extract_links_from_html(self, html, base_url: str) -> Optional[List[str]]:
+        """
+        Extract all links from raw HTML without building a soup, with selectolax
+        when it is installed and an lxml XPath query otherwise.
+        
+        Args:
+            html: HTML of the page, as bytes or text
+            base_url: Base URL of the page
+            
+        Returns:
+            List of absolute URLs, or None if the HTML could not be parsed
+        """
+        if LexborHTMLParser is not None:
+            try:
+                hrefs = [node.attributes.get('href') or '' for node in LexborHTMLParser(html).css('a[href]')]
+                return self._normalize_links(hrefs, base_url)
+            except Exception as e:
+                self.logger.debug(f"Could not parse links of {base_url} with selectolax: {str(e)}")
+        
+        try:
+            import lxml.html
+            
+            hrefs = lxml.html.fromstring(html).xpath('//a/@href')
+        except ImportError:
+            self.logger.debug("lxml not installed. Install with: pip install lxml")
+            return None
+        except Exception as e:
+            self.logger.debug(f"Could not parse links of {base_url} with lxml: {str(e)}")
+            return None
+        
+        return self._normalize_links(hrefs, base_url)
+    
+    def _normalize_links(self, hrefs: Iterable[str], base_url: str) -> List[str]:
+        """
+        Turn href values into a list of unique absolute URLs.
         
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
+        Args:
+            hrefs: Values of the href attributes
+            base_url: Base URL of the page
             
-            # Skip anchor links, javascript, and mailto
-            if href.startswith('#') or href.startswith('javascript:') or href.startswith('mailto:'):
+        Returns:
+            List of absolute URLs, in page order
+        """
+        links = []
+        seen = set()
+        
+        for href in hrefs:
+            # Skip anchor links, javascript, mailto and other non-page links
+            if href.startswith(SKIP_LINK_PREFIXES):
                 continue
             
-            # Convert to absolute URL
-            absolute_url = urljoin(base_url, href)
+            # Convert to absolute URL, absolute links need no join
+            parts = urlsplit(href)
+            if not parts.scheme:
+                parts = urlsplit(urljoin(base_url, href))
             
-            # Normalize the URL
-            parsed = urlparse(absolute_url)
-            normalized_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-            if parsed.query:
-                normalized_url += f"?{parsed.query}"
-                
-            links.append(normalized_url)
+            # Normalize the URL by dropping the fragment
+            normalized_url = urlunsplit((parts.scheme, parts.netloc, parts.path, parts.query, ''))
+            
+            # Remove duplicates, keeping the page order
+            if normalized_url not in seen:
+                seen.add(normalized_url)
+                links.append(normalized_url)
         
-        return list(set(links))  # Remove duplicates
+        return links
     
     def _find_main_content(self, soup: BeautifulSoup) -> Optional[Tag]:
         """
@@ -130,144 +204,155 @@ class HTMLParser:
         Returns:
             Tag object representing the main content area
         """
-        # Try to find by common semantic elements
-        for tag in ['main', 'article', 'section']:
-            content = soup.find(tag)
-            if content:
-                return content
-        
-        # Try to find by common content IDs
-        for id_value in self.content_identifiers['id']:
-            content = soup.find(id=id_value)
-            if content:
-                return content
-        
-        # Try to find by common content classes
-        for class_value in self.content_identifiers['class']:
-            content = soup.find(class_=class_value)
-            if content:
-                return content
-        
-        # Fallback: Find the div with the most paragraphs
-        divs = soup.find_all('div')
-        if divs:
-            div_with_most_paragraphs = max(divs, key=lambda div: len(div.find_all('p')), default=None)
-            if div_with_most_paragraphs and len(div_with_most_paragraphs.find_all('p')) > 2:
+        # Find every candidate in one selector query, then keep the one with the best rank,
+        # semantic elements first, then content IDs, then content classes
+        candidates = soup.select(self._content_selector)
+        if candidates:
+            return min(candidates, key=self._content_rank)
+        
+        # Fallback: Find the div with the most paragraphs, counting each paragraph
+        # towards its enclosing divs instead of searching every div
+        paragraph_counts = {}
+        for p in soup.find_all('p'):
+            for parent in p.parents:
+                if parent.name == 'div':
+                    paragraph_counts[id(parent)] = paragraph_counts.get(id(parent), 0) + 1
+        
+        if paragraph_counts:
+            # The first div in document order wins ties
+            div_with_most_paragraphs = max(soup.find_all('div'), key=lambda div: paragraph_counts.get(id(div), 0))
+            if paragraph_counts.get(id(div_with_most_paragraphs), 0) > 2:
                 return div_with_most_paragraphs
         
         return None
     
-    def _extract_headings(self, content: Tag) -> Dict[str, List[str]]:
+    def _content_rank(self, tag: Tag) -> int:
         """
-        Extract all headings from the content.
+        Rank a main content candidate, lower is better.
         
         Args:
-            content: Tag object representing the content area
+            tag: Tag object matching the content selector
             
         Returns:
-            Dictionary with heading levels and their text
+            Rank of the tag
         """
-        headings = {}
-        
-        for level in range(1, 7):
-            heading_tags = content.find_all(f'h{level}')
-            if heading_tags:
-                headings[f'h{level}'] = [h.get_text(strip=True) for h in heading_tags]
-        
-        return headings
+        if tag.name in CONTENT_TAGS:
+            return CONTENT_TAGS.index(tag.name)
+        if tag.get('id') in self.content_identifiers['id']:
+            return len(CONTENT_TAGS)
+        return len(CONTENT_TAGS) + 1
     
-    def _extract_paragraphs(self, content: Tag) -> List[str]:
+    def _walk_once(self, content: Tag) -> Dict[str, Any]:
         """
-        Extract all paragraphs from the content.
+        Extract headings, paragraphs, lists and tables from the content in a single traversal.
         
         Args:
             content: Tag object representing the content area
             
         Returns:
-            List of paragraph texts
+            Dictionary with 'headings', 'paragraphs', 'lists' and 'tables'
         """
+        headings = {}
         paragraphs = []
+        lists = []
+        tables = []
         
-        for p in content.find_all('p'):
-            # Skip empty paragraphs
-            text = p.get_text(strip=True)
-            if text:
-                paragraphs.append(text)
-        
-        return paragraphs
+        for element in content.find_all(True):
+            name = element.name
+            
+            if name in HEADING_TAGS:
+                headings.setdefault(name, []).append(element.get_text(strip=True))
+            
+            elif name == 'p':
+                # Skip empty paragraphs
+                text = element.get_text(strip=True)
+                if text:
+                    paragraphs.append(text)
+            
+            elif name == 'ul' or name == 'ol':
+                items = [text for text in (li.get_text(strip=True) for li in element.find_all('li')) if text]
+                if items:
+                    lists.append({
+                        'type': 'unordered' if name == 'ul' else 'ordered',
+                        'items': items
+                    })
+            
+            elif name == 'table':
+                table_data = self._extract_table(element)
+                if table_data['headers'] or table_data['rows']:
+                    tables.append(table_data)
+        
+        return {
+            # Keep the heading levels in order
+            'headings': {level: headings[level] for level in HEADING_TAGS if level in headings},
+            'paragraphs': paragraphs,
+            'lists': lists,
+            'tables': tables
+        }
     
-    def _extract_lists(self, content: Tag) -> List[Dict[str, List[str]]]:
+    def _extract_table(self, table_tag: Tag) -> Dict[str, Any]:
         """
-        Extract all lists from the content.
+        Extract the structure of a table.
         
         Args:
-            content: Tag object representing the content area
+            table_tag: Tag object of the table
             
         Returns:
-            List of dictionaries containing list type and items
+            Dictionary with the table headers and rows
         """
-        lists = []
+        table_data = {
+            'headers': [],
+            'rows': []
+        }
         
-        for list_tag in content.find_all(['ul', 'ol']):
-            list_type = 'unordered' if list_tag.name == 'ul' else 'ordered'
-            items = [li.get_text(strip=True) for li in list_tag.find_all('li') if li.get_text(strip=True)]
-            
-            if items:
-                lists.append({
-                    'type': list_type,
-                    'items': items
-                })
+        # Extract headers
+        thead = table_tag.find('thead')
+        if thead:
+            th_tags = thead.find_all('th')
+            if th_tags:
+                table_data['headers'] = [th.get_text(strip=True) for th in th_tags]
+        
+        first_row = None
+        if not table_data['headers']:
+            # Try to get headers from first row if no thead
+            first_row = table_tag.find('tr')
+            if first_row:
+                th_tags = first_row.find_all('th')
+                if th_tags:
+                    table_data['headers'] = [th.get_text(strip=True) for th in th_tags]
+        
+        # Extract rows
+        tbody = table_tag.find('tbody') or table_tag
+        for tr in tbody.find_all('tr'):
+            # Skip if this is a header row we've already processed
+            if tr is first_row and table_data['headers']:
+                continue
+                
+            row = [td.get_text(strip=True) for td in tr.find_all(['td', 'th'])]
+            if row:
+                table_data['rows'].append(row)
         
-        return lists
+        return table_data
     
-    def _extract_tables(self, content: Tag) -> List[Dict[str, any]]:
+    def _is_skipped(self, tag: Tag) -> bool:
         """
-        Extract all tables from the content.
+        Check whether an element should be left out of the clean text.
         
         Args:
-            content: Tag object representing the content area
+            tag: Tag object to check
             
         Returns:
-            List of dictionaries containing table structure
+            True if the tag is a skipped element or has a skipped ID or class
         """
-        tables = []
+        if tag.name in self.skip_tags:
+            return True
         
-        for table_tag in content.find_all('table'):
-            table_data = {
-                'headers': [],
-                'rows': []
-            }
-            
-            # Extract headers
-            thead = table_tag.find('thead')
-            if thead:
-                th_tags = thead.find_all('th')
-                if th_tags:
-                    table_data['headers'] = [th.get_text(strip=True) for th in th_tags]
-            
-            if not table_data['headers']:
-                # Try to get headers from first row if no thead
-                first_row = table_tag.find('tr')
-                if first_row:
-                    th_tags = first_row.find_all('th')
-                    if th_tags:
-                        table_data['headers'] = [th.get_text(strip=True) for th in th_tags]
-            
-            # Extract rows
-            tbody = table_tag.find('tbody') or table_tag
-            for tr in tbody.find_all('tr'):
-                # Skip if this is a header row we've already processed
-                if tr == first_row and table_data['headers']:
-                    continue
-                    
-                row = [td.get_text(strip=True) for td in tr.find_all(['td', 'th'])]
-                if row:
-                    table_data['rows'].append(row)
-            
-            if table_data['headers'] or table_data['rows']:
-                tables.append(table_data)
+        classes = tag.get('class')
+        if classes and not self._skip_classes.isdisjoint(classes):
+            return True
         
-        return tables
+        tag_id = tag.get('id')
+        return bool(tag_id) and not self._skip_ids.isdisjoint(tag_id.split())
     
     def _extract_clean_text(self, content: Tag) -> str:
         """
@@ -279,32 +364,21 @@ class HTMLParser:
         Returns:
             Clean text content
         """
-        # Make a copy to avoid modifying the original
-        content_copy = BeautifulSoup(str(content), 'html.parser')
+        # Make a copy to avoid modifying the original, cloning the tree avoids re-parsing it
+        content_copy = copy.copy(content)
         
-        # Remove unwanted elements
-        for tag in self.skip_tags:
-            for element in content_copy.find_all(tag):
+        # Remove unwanted elements and elements with unwanted IDs or classes in a single walk
+        for element in content_copy.find_all(self._is_skipped):
+            # Elements inside an already removed element are gone with it
+            if not element.decomposed:
                 element.decompose()
         
-        # Remove elements with unwanted IDs or classes
-        for attribute, values in self.skip_identifiers.items():
-            for value in values:
-                for element in content_copy.find_all(attrs={attribute: lambda x: x and value in x.split()}):
-                    element.decompose()
-        
-        # Get text with newlines
-        text = ''
-        for element in content_copy.descendants:
-            if isinstance(element, NavigableString):
-                parent = element.parent
-                if parent and parent.name not in self.skip_tags:
-                    text += str(element)
-            elif element.name in ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'tr', 'br']:
-                text += '\n'
-        
-        # Clean up whitespace
-        lines = [line.strip() for line in text.split('\n')]
-        clean_text = '\n'.join(line for line in lines if line)
+        # Get text with newlines, a line break starts every block element
+        for element in content_copy.find_all(LINE_BREAK_TAGS):
+            element.insert_before('\n')
+        text = content_copy.get_text()
+        
+        # Clean up whitespace, stripping every line and dropping empty ones
+        clean_text = BLANK_LINES.sub('\n', text).strip()
         
         return clean_text
\ No newline at end of file
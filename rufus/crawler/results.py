@@ -0,0 +1,104 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+@dataclass
+class CrawlResults:
+    """
+    Column-oriented storage for crawled pages.
+    
+    Each field of a page is kept in its own list, with numeric fields packed
+    into arrays, instead of one nested dictionary per page. The dictionary of
+    a page is built on first access and the same dictionary is returned from
+    then on, so the results can be used like the list of page dictionaries the
+    crawler used to return, including changes made to the pages. The columns
+    keep the values as crawled.
+    """
+    
+    urls: List[str] = field(default_factory=list)
+    titles: List[str] = field(default_factory=list)
+    contents: List[Dict[str, Any]] = field(default_factory=list)
+    htmls: List[Optional[str]] = field(default_factory=list)
+    depths: array = field(default_factory=lambda: array('H'))
+    status_codes: array = field(default_factory=lambda: array('H'))
+    content_types: List[str] = field(default_factory=list)
+    timestamps: array = field(default_factory=lambda: array('d'))
+    rendered: List[Optional[bool]] = field(default_factory=list)
+    _rows: List[Optional[Dict[str, Any]]] = field(default_factory=list, repr=False, compare=False)
+
+    def append(self, page: Dict[str, Any]) -> None:
+        """
+        Add a page.
+        
+        Args:
+            page: Page dictionary with url, title, content, html and metadata
+        """
+        metadata = page['metadata']
+        self.urls.append(page['url'])
+        self.titles.append(page['title'])
+        self.contents.append(page['content'])
+        self.htmls.append(page.get('html'))
+        self.depths.append(metadata['depth'])
+        self.status_codes.append(metadata['status_code'])
+        self.content_types.append(metadata['content_type'])
+        self.timestamps.append(metadata['timestamp'])
+        self.rendered.append(metadata.get('rendered'))
+        self._rows.append(None)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """
+        Get the dictionary of a page, building it on first access.
+        
+        Args:
+            index: Position of the page
+        
+        Returns:
+            Page dictionary with url, title, content, html and metadata,
+            the same object on every call
+        """
+        page = self._rows[index]
+        if page is not None:
+            return page
+        
+        metadata = {
+            'depth': self.depths[index],
+            'status_code': self.status_codes[index],
+            'content_type': self.content_types[index],
+            'timestamp': self.timestamps[index]
+        }
+        if self.rendered[index] is not None:
+            metadata['rendered'] = self.rendered[index]
+        
+        page = {
+            'url': self.urls[index],
+            'title': self.titles[index],
+            'content': self.contents[index],
+            'html': self.htmls[index],
+            'metadata': metadata
+        }
+        self._rows[index] = page
+        return page
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the pages as dictionaries.
+        
+        Returns:
+            Iterator of page dictionaries, built on first access
+        """
+        return (self.row(i) for i in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.rows()
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CrawlResults index out of range")
+        return self.row(index)
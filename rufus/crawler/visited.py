@@ -0,0 +1,111 @@
+import logging
+from typing import Any, Iterable, List
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Ports implied by the scheme, dropped from canonical URLs
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def canonicalize_url(url: str) -> str:
+    """
+    Reduce a URL to a canonical form so equivalent spellings are only visited once.
+    
+    Lowercases the scheme and host, drops default ports, fragments and trailing
+    slashes, and sorts the query parameters.
+    
+    Args:
+        url: URL to canonicalize
+    
+    Returns:
+        Canonical URL
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    
+    return urlunsplit((scheme, host, path, query, ''))
+
+class VisitedSet:
+    """
+    Set of visited URLs, keyed by their canonical form.
+    
+    Uses an exact set by default. With use_bloom_filter, a scalable Bloom filter
+    from pybloom_live keeps the memory of large crawls low, at the cost of rarely
+    reporting an unvisited URL as visited.
+    """
+
+    def __init__(self, config: Any):
+        """
+        Initialize the visited set.
+        
+        Args:
+            config: Configuration settings
+        """
+        self.config = config
+        self.logger = logging.getLogger("rufus.crawler")
+        self._count = 0
+        self._urls = None
+        
+        if self.config.get('use_bloom_filter', False):
+            try:
+                from pybloom_live import ScalableBloomFilter
+                
+                self._urls = ScalableBloomFilter(
+                    initial_capacity=self.config.get('bloom_initial_capacity', 10000),
+                    error_rate=self.config.get('bloom_error_rate', 1e-6)
+                )
+            except ImportError:
+                self.logger.debug("pybloom_live not installed, using a set. Install with: pip install pybloom-live")
+        
+        if self._urls is None:
+            self._urls = set()
+
+    def add(self, url: str) -> None:
+        """
+        Mark a URL as visited.
+        
+        Args:
+            url: URL to add
+        """
+        key = canonicalize_url(url)
+        if key not in self._urls:
+            self._urls.add(key)
+            self._count += 1
+
+    def claim(self, urls: Iterable[str]) -> List[str]:
+        """
+        Mark URLs as visited, returning the ones that were not visited yet.
+        
+        Args:
+            urls: URLs to claim, duplicates are claimed once
+        
+        Returns:
+            The newly claimed URLs, in their original order
+        """
+        visited = self._urls
+        claimed = []
+        
+        # Canonicalize each distinct URL only once
+        for url in dict.fromkeys(urls):
+            key = canonicalize_url(url)
+            if key not in visited:
+                visited.add(key)
+                claimed.append(url)
+        
+        self._count += len(claimed)
+        return claimed
+    
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_url(url) in self._urls
+
+    def __len__(self) -> int:
+        return self._count
@@ -1,18 +1,64 @@
 import logging
+import re
 import json
+import orjson
 import csv
 import io
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import math
+import hashlib
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from typing import List, Dict, Any, Optional, TextIO, TYPE_CHECKING
+import httpx
 from dotenv import load_dotenv
 import os
 
 from ..utils.error import RufusError, handle_error
+from ..utils.batch import run_batch
+from ..utils.cache import ResultCache, SemanticCache
+from ..utils.clients import retire_client
+from ..analyzer.embeddings import Embedder
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# First whitespace-separated word of a title
+FIRST_WORD = re.compile(r'\S+')
+
+# Decodes the leading JSON object of an LLM response, ignoring trailing text
+JSON_DECODER = json.JSONDecoder()
 
 class DocumentSynthesizer:
     """
     Document synthesizer for organizing extracted content into structured documents.
-    """    
+    """
+    # Instructions and schema shared by every synthesis request. Kept byte-identical
+    # and ahead of the page content so the provider's prompt cache can reuse the prefix.
+    _SYSTEM_PROMPT = """You are a content synthesis assistant that creates structured documents from web content.
+
+TASK:
+1. Synthesize the content from multiple web pages given by the user into a coherent, well-structured document.
+2. Organize the information logically with headings and sections.
+3. Remove redundant information.
+4. Provide your response in JSON format with the following structure:
+{
+    "title": "An informative title for the synthesized document",
+    "summary": "A concise summary of the key information",
+    "sections": [
+        {
+            "heading": "Section heading",
+            "content": "Section content..."
+        },
+        ...
+    ],
+    "key_points": ["Key point 1", "Key point 2", ...]
+}"""
+    
+    # Heading of the user message, followed directly by the page content
+    _USER_PREFIX = "CONTENT FROM MULTIPLE WEB PAGES:\n"
+    
     def __init__(self, config: Any):
         """
         Initialize the document synthesizer.
@@ -39,13 +85,106 @@ class DocumentSynthesizer:
                     self.logger.warning("No API key found in environment variables. Synthesis features may not work.")
                 
                 self.model = self.config.get('openai_model', 'gpt-4o-mini')
+                self.small_model = self.config.get('small_model') or self.model
             else:
                 raise RufusError(f"Unsupported LLM provider for synthesis: {self.llm_provider}")
+        
+        # Exact-match cache of syntheses
+        self.cache = ResultCache(self.config, namespace="rufus:synthesis") if self.config.get('use_llm_cache', False) else None
+        
+        # Similarity cache of syntheses, loaded on the first synthesis that uses the LLM
+        self.embedder = None
+        self.semantic_cache = None
+        
+        # Content formatter of each output format
+        self._formatters = {
+            'json': self._format_as_json,
+            'text': self._format_as_text,
+            'csv': self._format_as_csv
+        }
+        
+        # LLM client reused across syntheses to keep connections alive, created on first use
+        self._client = None
+        self._client_loop = None
     
     @handle_error
     def synthesize(self, analyzed_content: List[Dict[str, Any]], output_format: str = "json") -> List[Dict[str, Any]]:
         """
         Synthesize analyzed content into structured documents.
+        Blocking wrapper around synthesize_async. Called from a running event loop,
+        e.g. in Jupyter, it runs the synthesis on its own loop in a worker thread.
+        Args:
+            analyzed_content: Content that has been analyzed for relevance
+            output_format: Format of the output documents ('json', 'text', 'csv')
+        Returns:
+            List of structured documents
+        """
+        async def run():
+            try:
+                return await self.synthesize_async(analyzed_content, output_format)
+            finally:
+                # The connections cannot outlive the event loop of this call
+                await self.aclose()
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(run())
+        
+        # asyncio.run cannot nest inside a running loop, so give the synthesis a thread of its own
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, run()).result()
+    
+    def _get_client(self) -> "AsyncOpenAI":
+        """
+        Get the LLM client, creating it on first use.
+        
+        Returns:
+            AsyncOpenAI client with a connection pool sized by http_pool and http_keepalive
+        """
+        loop = asyncio.get_running_loop()
+        
+        # A client's connections are bound to the event loop it was created on
+        if self._client is None or self._client_loop is not loop:
+            # Imported here so importing Rufus does not load the OpenAI SDK
+            from openai import AsyncOpenAI
+            
+            # Close the connection pool of the previous loop instead of orphaning it
+            if self._client is not None:
+                retire_client(self._client.close, self._client_loop, "LLM client")
+            
+            http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.config.get('llm_timeout', 60.0)),
+                limits=httpx.Limits(
+                    max_connections=self.config.get('http_pool', 100),
+                    max_keepalive_connections=self.config.get('http_keepalive', 50)
+                )
+            )
+            if self.api_key:
+                self._client = AsyncOpenAI(api_key=self.api_key, http_client=http_client)
+            else:
+                self._client = AsyncOpenAI(http_client=http_client)
+            self._client_loop = loop
+        
+        return self._client
+    
+    async def aclose(self) -> None:
+        """
+        Close the HTTP connections of the LLM client and the cache.
+        """
+        if self._client is not None:
+            await self._client.close()
+        self._client = None
+        self._client_loop = None
+        
+        if self.cache:
+            await self.cache.aclose()
+    
+    @handle_error
+    async def synthesize_async(self, analyzed_content: List[Dict[str, Any]], output_format: str = "json") -> List[Dict[str, Any]]:
+        """
+        Synthesize analyzed content into structured documents.
+        The LLM syntheses of all groups are generated concurrently.
         Args:
             analyzed_content: Content that has been analyzed for relevance
             output_format: Format of the output documents ('json', 'text', 'csv')
@@ -63,51 +202,136 @@ class DocumentSynthesizer:
             # Each page becomes its own document
             grouped_content = {f"doc_{i}": [page] for i, page in enumerate(analyzed_content)}
         
-        # Synthesize each group into a document
-        documents = []
+        # Generate the LLM syntheses of all multi-page groups before building the documents
+        synthesized = {}
+        llm_groups = self._llm_groups(grouped_content) if self.config.get('use_llm_for_synthesis', True) else {}
+        if llm_groups:
+            # Serve groups synthesized before from the caches
+            synthesized, vectors = await self._lookup_cache(grouped_content, llm_groups)
+            pending = {group_id: content for group_id, content in llm_groups.items() if group_id not in synthesized}
+            
+            if pending:
+                client = self._get_client()
+                # A batch job can take hours, so only large syntheses are worth the wait
+                if self.config.get('use_batch_api', False) and len(pending) >= self.config.get('batch_api_min_groups', 10):
+                    fresh = await self._synthesize_batch(client, grouped_content, pending)
+                else:
+                    fresh = await self._synthesize_concurrently(client, grouped_content, pending)
+                
+                await self._store_cache(grouped_content, pending, fresh, vectors)
+                synthesized.update(fresh)
         
-        for group_id, pages in grouped_content.items():
-            document = self._create_document(group_id, pages, output_format)
-            documents.append(document)
+        # Read the relevance scores out of the page metadata once for all groups
+        scores = self._relevance_scores(analyzed_content)
+        
+        # Build and format the documents off the event loop, the LLM work is already done
+        loop = asyncio.get_running_loop()
+        documents = await loop.run_in_executor(
+            None, self._create_documents, grouped_content, output_format, synthesized, scores
+        )
         
-        # Sort documents by relevance if available
-        if all('metadata' in doc and 'relevance_score' in doc['metadata'] for doc in documents):
-            documents.sort(key=lambda x: x['metadata']['relevance_score'], reverse=True)
+        # Sort documents by relevance if available, documents without a score go last
+        document_scores = [doc.get('metadata', {}).get('relevance_score') for doc in documents]
+        if any(score is not None for score in document_scores):
+            order = sorted(
+                range(len(documents)),
+                key=lambda i: -math.inf if document_scores[i] is None else document_scores[i],
+                reverse=True
+            )
+            documents = [documents[i] for i in order]
         
         self.logger.info(f"Synthesized {len(documents)} documents")
         return documents
     
-    def _create_document(self, group_id: str, pages: List[Dict[str, Any]], output_format: str) -> Dict[str, Any]:
+    def _create_documents(self, grouped_content: Dict[str, List[Dict[str, Any]]], output_format: str,
+                          synthesized: Dict[str, Dict[str, Any]], scores: Dict[int, float]) -> List[Dict[str, Any]]:
+        """
+        Create the documents of all groups.
+        Args:
+            grouped_content: Dictionary mapping group ID to list of pages
+            output_format: Format of the output documents
+            synthesized: Dictionary mapping the ID of each group synthesized with the LLM to its synthesis
+            scores: Relevance scores from _relevance_scores
+        Returns:
+            List of structured documents, in group order
+        """
+        return [
+            self._create_document(group_id, pages, output_format, synthesized.get(group_id), scores)
+            for group_id, pages in grouped_content.items()
+        ]
+    
+    def _create_document(self, group_id: str, pages: List[Dict[str, Any]], output_format: str,
+                         synthesized: Optional[Dict[str, Any]] = None,
+                         scores: Optional[Dict[int, float]] = None) -> Dict[str, Any]:
         """
         Create a document from a group of pages.
         Args:
             group_id: Identifier for the group
             pages: List of pages in the group
             output_format: Format of the output document
+            synthesized: LLM synthesis generated for the group, None if the group is not synthesized with the LLM
+            scores: Relevance scores from _relevance_scores, read from the pages if None
         Returns:
             Structured document
         """
-        if self.config.get('use_llm_for_synthesis', True) and len(pages) > 1:
-            document = self._synthesize_with_llm(group_id, pages)
-        else:
-            document = self._synthesize_without_llm(group_id, pages)
-        if output_format == "json":
-            document['content'] = self._format_as_json(document['content'])
-        elif output_format == "text":
-            document['content'] = self._format_as_text(document['content'])
-        elif output_format == "csv":
-            document['content'] = self._format_as_csv(document['content'])
+        # Single pages in JSON need no combining and no formatting pass
+        if synthesized is None and len(pages) == 1 and output_format == "json":
+            return self._single_page_document(group_id, pages[0], scores)
+        
+        if synthesized is not None:
+            document = self._synthesize_with_llm(group_id, pages, synthesized, scores)
         else:
+            document = self._synthesize_without_llm(group_id, pages, scores)
+        try:
+            formatter = self._formatters[output_format]
+        except KeyError:
             raise RufusError(f"Unsupported output format: {output_format}")
         
+        document['content'] = formatter(document['content'])
+        
         return document
     
-    def _synthesize_without_llm(self, group_id: str, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    @staticmethod
+    def _relevance_scores(pages: List[Dict[str, Any]]) -> Dict[int, float]:
+        """
+        Collect the relevance scores of the analyzed pages.
+        Args:
+            pages: List of pages
+        Returns:
+            Dictionary mapping the id() of each analyzed page to its relevance score
+        """
+        scores = {}
+        
+        for page in pages:
+            relevance = page.get('metadata', {}).get('relevance')
+            if relevance is not None:
+                scores[id(page)] = relevance.get('score', 0)
+        
+        return scores
+    
+    def _overall_relevance(self, pages: List[Dict[str, Any]], scores: Optional[Dict[int, float]] = None) -> Optional[float]:
+        """
+        Average the relevance scores of a group of pages.
+        Args:
+            pages: List of pages in the group
+            scores: Relevance scores from _relevance_scores, read from the pages if None
+        Returns:
+            Mean relevance score of the analyzed pages, or None if none were analyzed
+        """
+        if scores is None:
+            scores = self._relevance_scores(pages)
+        
+        group_scores = [scores[id(page)] for page in pages if id(page) in scores]
+        return sum(group_scores) / len(group_scores) if group_scores else None
+    
+    def _synthesize_without_llm(self, group_id: str, pages: List[Dict[str, Any]],
+                                scores: Optional[Dict[int, float]] = None) -> Dict[str, Any]:
         """
         Synthesize pages into a document without using an LLM.
         Args:
             group_id: Identifier for the group
             pages: List of pages in the group
+            scores: Relevance scores from _relevance_scores, read from the pages if None
         Returns:
             Structured document
         """
@@ -115,34 +339,8 @@ class DocumentSynthesizer:
         titles = [page['title'] for page in pages]
         
         # Calculate overall relevance score if available
-        relevance_scores = [
-            page['metadata'].get('relevance', {}).get('score', 0)
-            for page in pages if 'metadata' in page and 'relevance' in page['metadata']
-        ]
-        
-        overall_relevance = sum(relevance_scores) / len(relevance_scores) if relevance_scores else None
-        combined_content = []
-        
-        for page in pages:
-            page_content = page['content']
-            
-            # Use filtered text if available, otherwise use full text
-            text = page_content.get('filtered_text', page_content.get('text', ''))
-            
-            # Add page information
-            section = {
-                'title': page['title'],
-                'url': page['url'],
-                'content': {
-                    'headings': page_content.get('headings', {}),
-                    'paragraphs': page_content.get('paragraphs', []),
-                    'lists': page_content.get('lists', []),
-                    'tables': page_content.get('tables', []),
-                    'text': text
-                }
-            }
-            
-            combined_content.append(section)
+        overall_relevance = self._overall_relevance(pages, scores)
+        combined_content = [self._page_section(page) for page in pages]
         
         # Create the document
         document = {
@@ -158,48 +356,228 @@ class DocumentSynthesizer:
         
         return document
     
-    def _synthesize_with_llm(self, group_id: str, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _single_page_document(self, group_id: str, page: Dict[str, Any],
+                              scores: Optional[Dict[int, float]] = None) -> Dict[str, Any]:
         """
-        Synthesize pages into a document using an LLM to organize and summarize content.
+        Build the document of a single page, the same as _synthesize_without_llm would.
         Args:
             group_id: Identifier for the group
-            pages: List of pages in the group
+            page: The page
+            scores: Relevance scores from _relevance_scores, read from the page if None
         Returns:
             Structured document
         """
-        # Extract relevant information from pages
-        urls = [page['url'] for page in pages]
-        titles = [page['title'] for page in pages]
+        if scores is None:
+            scores = self._relevance_scores([page])
         
-        # Calculate overall relevance score if available
-        relevance_scores = [
-            page['metadata'].get('relevance', {}).get('score', 0)
-            for page in pages if 'metadata' in page and 'relevance' in page['metadata']
-        ]
+        return {
+            'id': group_id,
+            'title': page['title'],
+            'sources': [page['url']],
+            'content': [self._page_section(page)],
+            'metadata': {
+                'num_pages': 1,
+                'relevance_score': scores.get(id(page))
+            }
+        }
+    
+    @staticmethod
+    def _page_section(page: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the section of a page in a document synthesized without the LLM.
+        The nested content structures are shared with the page, not copied.
+        Args:
+            page: The page
+        Returns:
+            Section with the title, URL and content of the page
+        """
+        page_content = page['content']
         
-        overall_relevance = sum(relevance_scores) / len(relevance_scores) if relevance_scores else None
+        return {
+            'title': page['title'],
+            'url': page['url'],
+            'content': {
+                'headings': page_content.get('headings', {}),
+                'paragraphs': page_content.get('paragraphs', []),
+                'lists': page_content.get('lists', []),
+                'tables': page_content.get('tables', []),
+                # Use filtered text if available, otherwise use full text
+                'text': page_content.get('filtered_text', page_content.get('text', ''))
+            }
+        }
+    
+    def _llm_groups(self, grouped_content: Dict[str, List[Dict[str, Any]]]) -> Dict[str, str]:
+        """
+        Select the groups worth synthesizing with the LLM and prepare their content.
+        Single pages and groups with less than min_synthesis_chars of content are kept as they are.
+        Args:
+            grouped_content: Dictionary mapping group ID to list of pages
+        Returns:
+            Dictionary mapping the ID of each selected group to its content
+        """
+        min_chars = self.config.get('min_synthesis_chars', 0)
+        llm_groups = {}
         
-        # Prepare content for LLM synthesis
-        content_for_synthesis = []
+        for group_id, pages in grouped_content.items():
+            if len(pages) > 1:
+                content = self._prepare_content(pages)
+                if len(content) >= min_chars:
+                    llm_groups[group_id] = content
         
-        for i, page in enumerate(pages):
-            page_content = page['content']
+        return llm_groups
+    
+    def _setup_embeddings(self) -> None:
+        """Load the embedding model and the semantic cache if they are enabled and not loaded yet."""
+        if self.semantic_cache is None and self.config.get('use_semantic_cache', False):
+            self.embedder = Embedder(self.config)
+            self.semantic_cache = SemanticCache(
+                self.config, self.embedder.dimension,
+                path=self.config.get('synthesis_cache_path')
+            )
+    
+    def _cache_key(self, pages: List[Dict[str, Any]], content: str) -> str:
+        """
+        Build the cache key of a synthesis.
+        
+        Args:
+            pages: List of pages in the group
+            content: Content to synthesize
             
-            # Use filtered text if available, otherwise use full text
-            text = page_content.get('filtered_text', page_content.get('text', ''))
+        Returns:
+            Cache key
+        """
+        return ResultCache.make_key(self._choose_model(pages, content), content)
+    
+    async def _lookup_cache(self, grouped_content: Dict[str, List[Dict[str, Any]]],
+                            contents: Dict[str, str]) -> tuple:
+        """
+        Look up syntheses in the exact-match cache, then in the semantic cache.
+        Args:
+            grouped_content: Dictionary mapping group ID to list of pages
+            contents: Dictionary mapping the ID of each group to synthesize to its content
+        Returns:
+            Tuple of the dictionary mapping group ID to cached synthesis, and a dictionary
+            mapping the ID of each group missed by the semantic cache to its embedding
+        """
+        synthesized = {}
+        vectors = {}
+        
+        if self.cache:
+            group_ids = list(contents)
+            cached = await asyncio.gather(*[
+                self.cache.get(self._cache_key(grouped_content[group_id], contents[group_id])) for group_id in group_ids
+            ])
+            synthesized = {group_id: value for group_id, value in zip(group_ids, cached) if value is not None}
+        
+        self._setup_embeddings()
+        pending = [group_id for group_id in contents if group_id not in synthesized]
+        
+        if pending and self.semantic_cache:
+            # Embedding is CPU-bound, keep it off the event loop
+            loop = asyncio.get_running_loop()
+            encoded = await loop.run_in_executor(None, self.embedder.encode, [contents[group_id] for group_id in pending])
             
-            # Truncate if too long
-            max_chars = self.config.get('max_synthesis_chars_per_page', 3000)
-            if len(text) > max_chars:
-                text = text[:max_chars] + "..."
+            for group_id, vector, value in zip(pending, encoded, self.semantic_cache.lookup(encoded)):
+                if value is not None:
+                    synthesized[group_id] = value
+                else:
+                    vectors[group_id] = vector
+        
+        return synthesized, vectors
+    
+    async def _store_cache(self, grouped_content: Dict[str, List[Dict[str, Any]]], contents: Dict[str, str],
+                           synthesized: Dict[str, Dict[str, Any]], vectors: Dict[str, Any]) -> None:
+        """
+        Store fresh syntheses in the caches. Failed syntheses are not cached so they are retried next time.
+        Args:
+            grouped_content: Dictionary mapping group ID to list of pages
+            contents: Dictionary mapping the ID of each synthesized group to its content
+            synthesized: Dictionary mapping group ID to synthesized content
+            vectors: Dictionary mapping group ID to the embedding of its content
+        """
+        succeeded = [group_id for group_id, result in synthesized.items() if 'error' not in result]
+        
+        if self.cache:
+            for group_id in succeeded:
+                await self.cache.set(self._cache_key(grouped_content[group_id], contents[group_id]), synthesized[group_id])
+        
+        embedded = [group_id for group_id in succeeded if group_id in vectors]
+        if self.semantic_cache and embedded:
+            import numpy as np
             
-            content_for_synthesis.append(f"--- PAGE {i+1}: {page['title']} ({page['url']}) ---\n{text}")
+            self.semantic_cache.add(np.stack([vectors[group_id] for group_id in embedded]), [synthesized[group_id] for group_id in embedded])
+            self.semantic_cache.save()
+    
+    async def _synthesize_concurrently(self, client: "AsyncOpenAI", grouped_content: Dict[str, List[Dict[str, Any]]],
+                                       contents: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate the LLM syntheses of the given groups concurrently.
+        Args:
+            client: AsyncOpenAI client used for the requests
+            grouped_content: Dictionary mapping group ID to list of pages
+            contents: Dictionary mapping the ID of each group to synthesize to its content
+        Returns:
+            Dictionary mapping group ID to synthesized content
+        """
+        semaphore = asyncio.Semaphore(self.config.get('max_concurrent_llm', 16))
         
-        # Join content with separators
-        all_content = "\n\n".join(content_for_synthesis)
+        async def generate(group_id):
+            async with semaphore:
+                return await self._generate_synthesis(client, grouped_content[group_id], contents[group_id])
+        
+        results = await asyncio.gather(*[generate(group_id) for group_id in contents])
+        return dict(zip(contents, results))
+    
+    async def _synthesize_batch(self, client: "AsyncOpenAI", grouped_content: Dict[str, List[Dict[str, Any]]],
+                                contents: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate the LLM syntheses of the given groups with one OpenAI Batch API job.
+        Cheaper than one request per group but results can take up to 24 hours,
+        so it is meant for non-interactive runs.
+        Args:
+            client: AsyncOpenAI client used for the requests
+            grouped_content: Dictionary mapping group ID to list of pages
+            contents: Dictionary mapping the ID of each group to synthesize to its content
+        Returns:
+            Dictionary mapping group ID to synthesized content
+        """
+        requests = [
+            {'custom_id': group_id, 'body': self._build_request(grouped_content[group_id], content)}
+            for group_id, content in contents.items()
+        ]
         
-        # Generate synthesized content using LLM
-        synthesized_content = self._generate_synthesis(all_content)
+        self.logger.info(f"Submitting {len(requests)} syntheses to the Batch API")
+        responses = await run_batch(client, requests, poll_interval=self.config.get('batch_poll_interval', 30))
+        
+        synthesized = {}
+        for request in requests:
+            body = responses.get(request['custom_id'])
+            if body:
+                synthesized[request['custom_id']] = self._parse_synthesis(body['choices'][0]['message']['content'])
+            else:
+                synthesized[request['custom_id']] = {"error": "Failed to synthesize content: batch request failed"}
+        
+        return synthesized
+    
+    def _synthesize_with_llm(self, group_id: str, pages: List[Dict[str, Any]],
+                             synthesized_content: Dict[str, Any],
+                             scores: Optional[Dict[int, float]] = None) -> Dict[str, Any]:
+        """
+        Synthesize pages into a document using an LLM to organize and summarize content.
+        Args:
+            group_id: Identifier for the group
+            pages: List of pages in the group
+            synthesized_content: Synthesis generated for the pages by the LLM
+            scores: Relevance scores from _relevance_scores, read from the pages if None
+        Returns:
+            Structured document
+        """
+        # Extract relevant information from pages
+        urls = [page['url'] for page in pages]
+        titles = [page['title'] for page in pages]
+        
+        # Calculate overall relevance score if available
+        overall_relevance = self._overall_relevance(pages, scores)
         
         # Create the document
         document = {
@@ -227,78 +605,222 @@ class DocumentSynthesizer:
         
         return document
     
-    def _generate_synthesis(self, content: str) -> Dict[str, Any]:
+    def _prepare_content(self, pages: List[Dict[str, Any]]) -> str:
         """
-        Generate a synthesized document from content using an LLM.
+        Join the text of a group of pages into the content sent to the LLM.
+        Args:
+            pages: List of pages in the group
+        Returns:
+            Content to synthesize
+        """
+        content_for_synthesis = []
+        dedupe = self.config.get('dedupe_synthesis_lines', True)
+        seen = set()  # hashes of the lines of the previous pages
+        
+        for i, page in enumerate(pages):
+            page_content = page['content']
+            
+            # Use filtered text if available, otherwise use full text, without surrounding whitespace
+            text = page_content.get('filtered_text', page_content.get('text', '')).strip()
+            
+            # Drop lines already sent with an earlier page, like navigation and other boilerplate
+            if dedupe and len(pages) > 1:
+                text = self._drop_seen_lines(text, seen)
+            
+            # Truncate if too long
+            max_chars = self.config.get('max_synthesis_chars_per_page', 3000)
+            if len(text) > max_chars:
+                text = text[:max_chars] + "..."
+            
+            content_for_synthesis.append(f"--- PAGE {i+1}: {page['title']} ({page['url']}) ---\n{text}")
+        
+        # Join content with separators
+        return "\n\n".join(content_for_synthesis)
+    
+    @staticmethod
+    def _drop_seen_lines(text: str, seen: set) -> str:
+        """
+        Remove the lines of a page that appeared on an earlier page of its group.
+        Args:
+            text: Text of the page
+            seen: Hashes of the lines of the earlier pages, updated with the lines of this page
+        Returns:
+            Text without the repeated lines
+        """
+        kept = []
+        page_hashes = set()
+        
+        for line in text.split('\n'):
+            stripped = line.strip()
+            if not stripped:
+                kept.append(line)
+                continue
+            
+            digest = hashlib.blake2b(stripped.encode('utf-8'), digest_size=8).digest()
+            if digest not in seen:
+                kept.append(line)
+                page_hashes.add(digest)
+        
+        seen.update(page_hashes)
+        return '\n'.join(kept).strip()
+    
+    def _build_prompt(self, content: str) -> str:
+        """
+        Build the user message for the given content.
+        The instructions are in the system message, so only the content varies between requests.
         
         Args:
             content: Content to synthesize
             
         Returns:
-            Synthesized content structure
+            User message for the LLM
+        """
+        return self._USER_PREFIX + content
+    
+    def _choose_model(self, pages: List[Dict[str, Any]], content: str) -> str:
+        """
+        Choose the model for a synthesis, using the small model for small inputs.
+        
+        Args:
+            pages: List of pages in the group
+            content: Content to synthesize
+            
+        Returns:
+            Name of the model
         """
-        prompt = f"""
-        You are an AI assistant that synthesizes web content into structured, coherent documents.
-        
-        CONTENT FROM MULTIPLE WEB PAGES:
-        {content}
-        
-        TASK:
-        1. Synthesize this content into a coherent, well-structured document.
-        2. Organize the information logically with headings and sections.
-        3. Remove redundant information.
-        4. Provide your response in JSON format with the following structure:
-        {{
-            "title": "An informative title for the synthesized document",
-            "summary": "A concise summary of the key information",
-            "sections": [
-                {{
-                    "heading": "Section heading",
-                    "content": "Section content..."
-                }},
-                ...
+        if len(pages) <= 2 or len(content) < self.config.get('small_model_max_chars', 4000):
+            return self.small_model
+        return self.model
+    
+    def _build_request(self, pages: List[Dict[str, Any]], content: str) -> Dict[str, Any]:
+        """
+        Build the chat completion request synthesizing the given content.
+        
+        Args:
+            pages: List of pages in the group
+            content: Content to synthesize
+            
+        Returns:
+            Keyword arguments of the chat completion call, also used as batch request body
+        """
+        # A synthesis is rarely longer than its input, roughly 4 characters per token
+        max_tokens = min(self.config.get('max_synthesis_tokens', 2000), max(256, len(content) // 4))
+        
+        return {
+            'model': self._choose_model(pages, content),
+            'messages': [
+                {"role": "system", "content": self._SYSTEM_PROMPT},
+                {"role": "user", "content": self._build_prompt(content)}
             ],
-            "key_points": ["Key point 1", "Key point 2", ...]
-        }}
+            'temperature': 0.3,
+            'max_tokens': max_tokens,
+            # JSON mode makes the model answer with a single JSON object and no prose
+            'response_format': {"type": "json_object"}
+        }
+    
+    async def _generate_synthesis(self, client: "AsyncOpenAI", pages: List[Dict[str, Any]], content: str) -> Dict[str, Any]:
         """
+        Generate a synthesized document from content using an LLM.
         
+        Args:
+            client: AsyncOpenAI client used for the request
+            pages: List of pages in the group
+            content: Content to synthesize
+            
+        Returns:
+            Synthesized content structure
+        """
         try:
             if self.llm_provider == 'openai':
-                client = OpenAI(api_key=self.api_key) if self.api_key else OpenAI()
-                response = client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a content synthesis assistant that creates structured documents from web content."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=2000
-                )
-                
-                content = response.choices[0].message.content
-            
-            # Extract the JSON response
-            try:
-                # Find JSON within the response
-                json_start = content.find('{')
-                json_end = content.rfind('}') + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_content = content[json_start:json_end]
-                    result = json.loads(json_content)
-                    return result
+                if self.config.get('stream_llm_responses', True):
+                    content = await self._stream_synthesis(client, pages, content)
                 else:
-                    self.logger.warning("Could not find JSON in LLM synthesis response")
-                    return {"error": "Failed to synthesize content"}
+                    response = await client.chat.completions.create(**self._build_request(pages, content))
                     
-            except (json.JSONDecodeError, ValueError) as e:
-                self.logger.error(f"Error parsing LLM synthesis response: {str(e)}")
-                return {"error": f"Failed to synthesize content: {str(e)}"}
+                    content = response.choices[0].message.content
+            
+            return self._parse_synthesis(content)
                 
         except Exception as e:
             self.logger.error(f"Error calling LLM API for synthesis: {str(e)}")
             return {"error": f"Failed to synthesize content: {str(e)}"}
     
+    async def _stream_synthesis(self, client: "AsyncOpenAI", pages: List[Dict[str, Any]], content: str) -> str:
+        """
+        Stream the LLM response of a synthesis, keeping the text from the opening brace of the JSON object.
+        Any prose before the object is dropped as it arrives instead of being searched for afterwards.
+        
+        Args:
+            client: AsyncOpenAI client used for the request
+            pages: List of pages in the group
+            content: Content to synthesize
+            
+        Returns:
+            Text of the response from its first '{', or the whole response if it has none
+        """
+        stream = await client.chat.completions.create(stream=True, **self._build_request(pages, content))
+        buf = io.StringIO()
+        preamble = []
+        started = False
+        
+        try:
+            async for event in stream:
+                delta = event.choices[0].delta.content if event.choices else None
+                if not delta:
+                    continue
+                
+                if not started:
+                    start = delta.find('{')
+                    if start < 0:
+                        preamble.append(delta)
+                        continue
+                    started = True
+                    delta = delta[start:]
+                
+                buf.write(delta)
+        finally:
+            await stream.close()
+        
+        return buf.getvalue() if started else ''.join(preamble)
+    
+    def _parse_synthesis(self, content: str) -> Dict[str, Any]:
+        """
+        Extract the synthesized document from an LLM response.
+        
+        Args:
+            content: Text of the LLM response
+            
+        Returns:
+            Synthesized content structure
+        """
+        # JSON mode responses are a bare object
+        try:
+            result = orjson.loads(content)
+            if isinstance(result, dict):
+                return result
+        except ValueError:
+            pass
+        
+        # Find JSON within the response
+        json_start = content.find('{')
+        if json_start < 0:
+            self.logger.warning("Could not find JSON in LLM synthesis response")
+            return {"error": "Failed to synthesize content"}
+        
+        try:
+            # Without JSON mode the object may be wrapped in prose
+            return orjson.loads(content[json_start:content.rfind('}') + 1])
+        except ValueError:
+            pass
+        
+        try:
+            # Otherwise decode one object and ignore whatever follows it, braces included
+            result, _ = JSON_DECODER.raw_decode(content, json_start)
+            return result
+        except ValueError as e:
+            self.logger.error(f"Error parsing LLM synthesis response: {str(e)}")
+            return {"error": f"Failed to synthesize content: {str(e)}"}
+    
     def _group_by_domain(self, pages: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """
         Group pages by domain.
@@ -307,18 +829,12 @@ class DocumentSynthesizer:
         Returns:
             Dictionary mapping domain to list of pages
         """
-        grouped = {}
+        grouped = defaultdict(list)
         
         for page in pages:
-            url = page['url']
-            domain = url.split('/')[2]  # Extract domain from URL
-            
-            if domain not in grouped:
-                grouped[domain] = []
-                
-            grouped[domain].append(page)
+            grouped[urlsplit(page['url']).netloc].append(page)
             
-        return grouped
+        return dict(grouped)
     
     def _group_by_topic(self, pages: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -330,20 +846,16 @@ class DocumentSynthesizer:
             Dictionary mapping topic ID to list of pages
         """
         # For simplicity, just group by the first word of the title
-        grouped = {}
+        grouped = defaultdict(list)
         
         for page in pages:
-            title = page['title']
-            first_word = title.split()[0] if title and title.split() else 'untitled'
+            # Scan up to the end of the first word only, without splitting the title
+            match = FIRST_WORD.search(page['title']) if page['title'] else None
+            first_word = match.group() if match else 'untitled'
             
-            topic_id = f"topic_{first_word.lower()}"
+            grouped[f"topic_{first_word.lower()}"].append(page)
             
-            if topic_id not in grouped:
-                grouped[topic_id] = []
-                
-            grouped[topic_id].append(page)
-            
-        return grouped
+        return dict(grouped)
     
     def _format_as_json(self, content: Any) -> Dict[str, Any]:
         """
@@ -364,84 +876,89 @@ class DocumentSynthesizer:
             Text-formatted content
         """
         if isinstance(content, list):
-            # Handling a list of page content
-            text_parts = []
+            # Handling a list of page content, each line is written with its newline
+            buf = io.StringIO()
+            w = buf.write
             
             for section in content:
-                text_parts.append(f"# {section['title']}")
-                text_parts.append(f"Source: {section['url']}")
-                text_parts.append("")
+                w(f"# {section['title']}\n")
+                w(f"Source: {section['url']}\n")
+                w("\n")
                 
                 # Add headings
                 for heading_type, headings in section['content'].get('headings', {}).items():
                     for heading in headings:
-                        text_parts.append(f"## {heading}")
+                        w(f"## {heading}\n")
                 
                 # Add paragraphs
                 for paragraph in section['content'].get('paragraphs', []):
-                    text_parts.append(paragraph)
-                    text_parts.append("")
+                    w(paragraph)
+                    w("\n\n")
                 
                 # Add lists
                 for list_item in section['content'].get('lists', []):
-                    text_parts.append(f"### {list_item['type'].capitalize()} List:")
+                    w(f"### {list_item['type'].capitalize()} List:\n")
                     for item in list_item['items']:
-                        text_parts.append(f"- {item}")
-                    text_parts.append("")
+                        w(f"- {item}\n")
+                    w("\n")
                 
                 # Add main text if available
                 if 'text' in section['content']:
-                    text_parts.append(section['content']['text'])
+                    w(section['content']['text'])
+                    w("\n")
                 
-                text_parts.append("\n---\n")
+                w("\n---\n\n")
             
-            return "\n".join(text_parts)
+            # No newline after the last line
+            return buf.getvalue()[:-1]
             
         elif isinstance(content, dict) and 'synthesized' in content:
             # Handling LLM-synthesized content
             synthesized = content['synthesized']
-            text_parts = []
+            buf = io.StringIO()
+            w = buf.write
             
             # Add title and summary
-            text_parts.append(f"# {synthesized.get('title', 'Synthesized Document')}")
-            text_parts.append("")
-            text_parts.append(synthesized.get('summary', ''))
-            text_parts.append("")
+            w(f"# {synthesized.get('title', 'Synthesized Document')}\n")
+            w("\n")
+            w(synthesized.get('summary', ''))
+            w("\n\n")
             
             # Add sections
             for section in synthesized.get('sections', []):
-                text_parts.append(f"## {section.get('heading', '')}")
-                text_parts.append(section.get('content', ''))
-                text_parts.append("")
+                w(f"## {section.get('heading', '')}\n")
+                w(section.get('content', ''))
+                w("\n\n")
             
             # Add key points
             if 'key_points' in synthesized and synthesized['key_points']:
-                text_parts.append("## Key Points")
+                w("## Key Points\n")
                 for point in synthesized['key_points']:
-                    text_parts.append(f"- {point}")
-                text_parts.append("")
+                    w(f"- {point}\n")
+                w("\n")
             
             # Add sources
-            text_parts.append("## Sources")
+            w("## Sources")
             for page in content.get('original_pages', []):
-                text_parts.append(f"- {page['title']}: {page['url']}")
+                w(f"\n- {page['title']}: {page['url']}")
             
-            return "\n".join(text_parts)
+            return buf.getvalue()
             
         else:
             # Fallback for unknown content structure
             return str(content)
     
-    def _format_as_csv(self, content: Any) -> str:
+    def _format_as_csv(self, content: Any, out: Optional[TextIO] = None) -> Optional[str]:
         """
         Format document content as CSV.
         Only works well for tabular data.
         Args:
             content: Document content
+            out: Text file to write the rows to, opened with newline=''
         Returns:
-            CSV-formatted content
+            CSV-formatted content, or None if the rows were written to out
         """
-        output = io.StringIO()
+        output = io.StringIO(newline='') if out is None else out
         writer = csv.writer(output)
         
         if isinstance(content, list):
@@ -500,7 +1017,34 @@ class DocumentSynthesizer:
             for page in content.get('original_pages', []):
                 writer.writerow(['', f"{page['title']}: {page['url']}"])
         
-        return output.getvalue()
+        return output.getvalue() if out is None else None
+    
+    def write_csv(self, documents: List[Dict[str, Any]], path: str) -> None:
+        """
+        Write documents to a CSV file, streaming the rows through a large write buffer.
+        Args:
+            documents: Documents synthesized with output format 'json' or 'csv'
+            path: Path of the CSV file
+        """
+        with open(path, 'w', buffering=1 << 20, newline='', encoding='utf-8') as f:
+            for document in documents:
+                content = document['content']
+                if isinstance(content, str):
+                    # Already formatted as CSV
+                    f.write(content)
+                else:
+                    self._format_as_csv(content, out=f)
+    
+    @staticmethod
+    def dumps(documents: List[Dict[str, Any]]) -> bytes:
+        """
+        Serialize documents to indented JSON.
+        Args:
+            documents: Documents to serialize
+        Returns:
+            UTF-8 encoded JSON, to be written to a file opened in binary mode
+        """
+        return orjson.dumps(documents, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
     
     @handle_error
     def generate_summary(self, documents: List[Dict[str, Any]]) -> str:
@@ -5,7 +5,9 @@ from tests.test_config import TestConfig
 from tests.test_parser import TestHTMLParser
 from tests.test_crawler import TestCrawler
 from tests.test_analyzer import TestContentAnalyzer
+from tests.test_synthesizer import TestDocumentSynthesizer
 from tests.test_integration import TestIntegration
+from tests.test_error import TestErrorResponse
 
 # Create a test suite
 def create_test_suite():
@@ -16,7 +18,9 @@ def create_test_suite():
     test_suite.addTest(unittest.makeSuite(TestHTMLParser))
     test_suite.addTest(unittest.makeSuite(TestCrawler))
     test_suite.addTest(unittest.makeSuite(TestContentAnalyzer))
+    test_suite.addTest(unittest.makeSuite(TestDocumentSynthesizer))
     test_suite.addTest(unittest.makeSuite(TestIntegration))
+    test_suite.addTest(unittest.makeSuite(TestErrorResponse))
     
     return test_suite
 
@@ -1,5 +1,4 @@
 import os
-import json
 import asyncio
 from rufus import RufusClient
 from dotenv import load_dotenv
@@ -62,8 +61,8 @@ async def main():
     
     # Save the documents
     output_file = "rufus_output.json"
-    with open(output_file, "w") as f:
-        json.dump(documents, f, indent=2)
+    with open(output_file, "wb") as f:
+        f.write(client.synthesizer.dumps(documents))
     
     print(f"Saved {len(documents)} documents to {output_file}")
     
@@ -79,7 +78,7 @@ async def main():
         if isinstance(documents[doc_idx]['content'], list):
             print(documents[doc_idx]['content'][0]['content']['text'][:500] + "...\n")
         else:
-            print(json.dumps(documents[doc_idx]['content'], indent=2)[:500] + "...\n")
+            print(client.synthesizer.dumps(documents[doc_idx]['content']).decode()[:500] + "...\n")
 
 if __name__ == "__main__":
     # Run the async main function
@@ -1,11 +1,15 @@
+import asyncio
+import tempfile
 import unittest
-from unittest.mock import patch, MagicMock
+import httpx
+from unittest.mock import patch, MagicMock, AsyncMock
 from rufus.utils.config import Config
 from rufus.analyzer.content import ContentAnalyzer
+from rufus.utils.cache import ResultCache
 
 class TestContentAnalyzer(unittest.TestCase):
     def setUp(self):
-        self.config = Config({"llm_provider": "openai"})
+        self.config = Config({"llm_provider": "openai", "stream_llm_responses": False})
         self.analyzer = ContentAnalyzer("fake_api_key", self.config)
     
     def test_split_text(self):
@@ -13,16 +17,133 @@ class TestContentAnalyzer(unittest.TestCase):
         chunks = self.analyzer._split_text(text, 15)
         self.assertEqual(len(chunks), 3)
     
-    @patch('openai.ChatCompletion.create')
-    def test_analyze_chunk(self, mock_create):
+    def test_analyze_chunk(self):
         # Mock the OpenAI API response
         mock_response = MagicMock()
-        mock_response.choices = [MagicMock(message=MagicMock(content='{"relevance_score": 0.8, "relevant_text": "This is relevant."}')), ]
-        mock_create.return_value = mock_response
+        mock_response.choices = [MagicMock(message=MagicMock(content='{"results": [{"id": 0, "relevance_score": 0.8, "relevant_text": "This is relevant."}]}')), ]
+        self.analyzer.client = MagicMock()
+        self.analyzer.client.chat.completions.create = AsyncMock(return_value=mock_response)
         
-        score, text = self.analyzer._analyze_chunk("Test content", "Find information about tests")
+        score, text = asyncio.run(self.analyzer._analyze_chunk("Test content", "Find information about tests"))
         self.assertEqual(score, 0.8)
         self.assertEqual(text, "This is relevant.")
+    
+    def test_analyze_chunks_batched(self):
+        # One request covers every chunk; results are mapped back by id
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content='{"results": [{"id": 1, "relevance_score": 0.9, "relevant_text": ["a", "b"]}, {"id": 0, "relevance_score": 0.1, "relevant_text": null}]}')), ]
+        self.analyzer.client = MagicMock()
+        self.analyzer.client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        results = asyncio.run(self.analyzer._analyze_chunks(["Chunk 0", "Chunk 1", "Chunk 2"], "Find information about tests"))
+        self.assertEqual(self.analyzer.client.chat.completions.create.call_count, 1)
+        self.assertEqual(results, [(0.1, None), (0.9, "a\n\nb"), (0.0, None)])
+    
+    def test_analyze_chunks_cached(self):
+        # Repeated chunks are served from the cache without another LLM call
+        analyzer = ContentAnalyzer("fake_api_key", Config({"use_llm_cache": True, "llm_cache_backend": "memory", "stream_llm_responses": False}))
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content='{"results": [{"id": 0, "relevance_score": 0.7, "relevant_text": "Cached"}]}')), ]
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        first = asyncio.run(analyzer._analyze_chunk("Test   content", "Find information about tests"))
+        second = asyncio.run(analyzer._analyze_chunk("Test content", "Find information about tests"))
+        self.assertEqual(first, second)
+        self.assertEqual(analyzer.client.chat.completions.create.call_count, 1)
+    
+    def test_unreachable_redis_falls_back(self):
+        # A failed first ping switches the cache to the next backend instead of failing every lookup
+        cache = ResultCache(Config({"llm_cache_backend": "memory", "cache_dir": tempfile.mkdtemp()}))
+        redis_client = MagicMock()
+        redis_client.ping = AsyncMock(side_effect=ConnectionError("Connection refused"))
+        redis_client.aclose = AsyncMock()
+        cache.backend = 'redis'
+        cache._redis_class = MagicMock()
+        cache._redis_class.from_url.return_value = redis_client
+        
+        async def roundtrip():
+            await cache.set("key", {"score": 1})
+            return await cache.get("key")
+        
+        self.assertEqual(asyncio.run(roundtrip()), {"score": 1})
+        self.assertIn(cache.backend, ('diskcache', 'memory'))
+        redis_client.ping.assert_awaited_once()
+        redis_client.aclose.assert_awaited_once()
+    
+    def test_parse_chunk_results_not_an_object(self):
+        # Valid JSON that is not an object is treated like an unparsable response
+        self.assertIsNone(self.analyzer._parse_chunk_results('[1, 2]', 2))
+        self.assertEqual(self.analyzer._parse_chunk_results('{"scores": 3, "results": 5}', 2), [(0.0, None), (0.0, None)])
+    
+    def _mock_stream(self, deltas):
+        # Async iterable standing in for the OpenAI response stream
+        stream = MagicMock()
+        stream.__aiter__.return_value = [MagicMock(choices=[MagicMock(delta=MagicMock(content=delta))]) for delta in deltas]
+        stream.close = AsyncMock()
+        return stream
+    
+    def test_stream_chunks(self):
+        analyzer = ContentAnalyzer("fake_api_key", Config({}))
+        stream = self._mock_stream(['{"scores": [0.9, 0.', '2], "results": [{"id": 0, ', '"relevant_text": "Relevant"}]}'])
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create = AsyncMock(return_value=stream)
+        
+        results = asyncio.run(analyzer._analyze_chunks(["Chunk 0", "Chunk 1"], "Find information about tests"))
+        self.assertTrue(analyzer.client.chat.completions.create.call_args.kwargs["stream"])
+        self.assertEqual(results, [(0.9, "Relevant"), (0.2, None)])
+    
+    def test_stream_chunks_stops_early(self):
+        # The stream is closed as soon as the scores show nothing is relevant
+        analyzer = ContentAnalyzer("fake_api_key", Config({}))
+        stream = self._mock_stream(['{"scores": [0.1, 0.2]', ', "results": [', '{"id": 0, "relevant_text": "Unused"}]}'])
+        analyzer.client = MagicMock()
+        analyzer.client.chat.completions.create = AsyncMock(return_value=stream)
+        
+        results = asyncio.run(analyzer._analyze_chunks(["Chunk 0", "Chunk 1"], "Find information about tests"))
+        self.assertEqual(results, [(0.1, None), (0.2, None)])
+        stream.close.assert_awaited_once()
+    
+    @patch('rufus.analyzer.content.run_batch', new_callable=AsyncMock)
+    def test_analyze_batch(self, mock_run_batch):
+        # Responses are joined back to pages by custom_id
+        pages = [
+            {"url": f"https://example.com/{i}", "content": {"text": f"Page {i}"}, "metadata": {}}
+            for i in range(4)
+        ]
+        mock_run_batch.return_value = {
+            "page-0-batch-0": {"choices": [{"message": {"content": '{"results": [{"id": 0, "relevance_score": 0.2, "relevant_text": null}]}'}}]},
+            "page-1-batch-0": {"choices": [{"message": {"content": '{"results": [{"id": 0, "relevance_score": 0.9, "relevant_text": "Relevant"}]}'}}]},
+            "page-2-batch-0": {"choices": []},
+            "page-3-batch-0": {"choices": [{"message": {"content": '[1, 2]'}}]}
+        }
+        
+        results = asyncio.run(self.analyzer.analyze_batch(pages, "Find information about tests"))
+        self.assertEqual(len(mock_run_batch.call_args[0][1]), 4)
+        self.assertEqual([page["url"] for page in results], ["https://example.com/1"])
+        self.assertEqual(results[0]["content"]["filtered_text"], "Relevant")
+
+    def test_analyze_across_event_loops(self):
+        # Each event loop, and each run after aclose(), gets a working LLM client
+        completion = {
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": '{"scores": [0.9], "results": [{"id": 0, "relevant_text": "Relevant"}]}'}}]
+        }
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json=completion))
+        analyzer = ContentAnalyzer("fake_api_key", Config({"stream_llm_responses": False}))
+        analyzer._build_http_client = lambda: httpx.AsyncClient(transport=transport)
+        pages = [{"url": "https://example.com", "title": "Example", "content": {"text": "Test content"}, "metadata": {}}]
+        
+        first = asyncio.run(analyzer.analyze(pages, "Find information about tests"))
+        first_http = analyzer._http
+        second = asyncio.run(analyzer.analyze(pages, "Find information about tests"))
+        self.assertIsNot(analyzer._http, first_http)
+        
+        asyncio.run(analyzer.aclose())
+        third = asyncio.run(analyzer.analyze(pages, "Find information about tests"))
+        self.assertEqual(len(first), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(second, third)
 
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -20,5 +20,14 @@ class TestConfig(unittest.TestCase):
         self.assertEqual(config.get("test_var"), "test_value")
         del os.environ["RUFUS_TEST_VAR"]
 
+    def test_attribute_access(self):
+        config = Config({"crawl_delay": 0})
+        self.assertEqual(config.crawl_delay, 0)
+        config["crawl_delay"] = 2
+        self.assertEqual(config.crawl_delay, 2)
+        evolved = config.evolve(crawl_delay=5)
+        self.assertEqual(evolved.crawl_delay, 5)
+        self.assertEqual(config.crawl_delay, 2)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
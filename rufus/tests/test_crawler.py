@@ -2,6 +2,8 @@ import unittest
 from unittest.mock import MagicMock, patch
 from rufus.utils.config import Config
 from rufus.crawler.crawler import Crawler
+from rufus.crawler.visited import VisitedSet
+from rufus.crawler.results import CrawlResults
 
 class TestCrawler(unittest.TestCase):
     def setUp(self):
@@ -13,6 +15,7 @@ class TestCrawler(unittest.TestCase):
         # Mock the requests.get response
         mock_response = MagicMock()
         mock_response.text = "<html><body><p>Test content</p></body></html>"
+        mock_response.content = mock_response.text.encode("utf-8")
         mock_response.status_code = 200
         mock_response.headers = {"Content-Type": "text/html"}
         mock_get.return_value = mock_response
@@ -33,5 +36,35 @@ class TestCrawler(unittest.TestCase):
         self.assertEqual(len(filtered), 1)
         self.assertEqual(filtered[0], "https://example.com/page1")
 
+    def test_visited_set_canonical(self):
+        visited = VisitedSet(self.config)
+        visited.add("https://Example.com:443/page/?b=2&a=1#top")
+        self.assertIn("https://example.com/page?a=1&b=2", visited)
+        self.assertNotIn("https://example.com/other", visited)
+        self.assertEqual(len(visited), 1)
+
+        claimed = visited.claim(["https://example.com/page?b=2&a=1", "https://example.com/new", "https://example.com/new/"])
+        self.assertEqual(claimed, ["https://example.com/new"])
+        self.assertEqual(len(visited), 2)
+
+    def test_crawl_results_rows(self):
+        results = CrawlResults()
+        page = {
+            "url": "https://example.com", "title": "Example", "content": {"text": "Test"}, "html": None,
+            "metadata": {"depth": 1, "status_code": 200, "content_type": "text/html", "timestamp": 1.5}
+        }
+        results.append(page)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0], page)
+        self.assertEqual(list(results), [page])
+
+        # Changes to a page are kept, as with a list of dictionaries
+        for row in results:
+            row["title"] = "Changed"
+            row["metadata"]["relevance"] = {"score": 0.5}
+        self.assertIs(results[0], results[0])
+        self.assertEqual(results[0]["title"], "Changed")
+        self.assertEqual(results[0]["metadata"]["relevance"], {"score": 0.5})
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
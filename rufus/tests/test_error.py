@@ -0,0 +1,19 @@
+import unittest
+from rufus.utils.error import RufusError, APIError, format_error_response
+
+class TestErrorResponse(unittest.TestCase):
+    def test_format_rufus_error(self):
+        response = format_error_response(APIError("Request failed", code="api_error"))
+        self.assertEqual(response, {"error": True, "error_type": "APIError", "message": "Request failed", "error_code": "api_error"})
+        
+        # Callers get their own dictionary even when the response comes from the cache
+        response["message"] = "Changed"
+        self.assertEqual(format_error_response(APIError("Request failed", code="api_error"))["message"], "Request failed")
+    
+    def test_format_unhashable_code(self):
+        response = format_error_response(RufusError("m", code=["x"]))
+        self.assertEqual(response["error_code"], ["x"])
+        self.assertEqual(response["message"], "m")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,30 +1,49 @@
+import asyncio
 import unittest
-from unittest.mock import patch, MagicMock
+from contextlib import ExitStack
+from unittest.mock import patch
 from rufus.client import RufusClient
+from rufus.crawler.crawler import Crawler
+from rufus.analyzer.content import ContentAnalyzer
+from rufus.synthesizer.document import DocumentSynthesizer
 
 class TestIntegration(unittest.TestCase):
-    @patch('rufus.crawler.crawler.Crawler.crawl')
-    @patch('rufus.analyzer.content.ContentAnalyzer.analyze')
-    @patch('rufus.synthesizer.document.DocumentSynthesizer.synthesize')
-    def test_scrape_flow(self, mock_synthesize, mock_analyze, mock_crawl):
+    @classmethod
+    def setUpClass(cls):
+        # Patch the pipeline stages once for all tests
+        cls._patches = ExitStack()
+        cls.mock_crawl = cls._patches.enter_context(patch.object(Crawler, 'crawl'))
+        cls.mock_analyze = cls._patches.enter_context(patch.object(ContentAnalyzer, 'analyze'))
+        cls.mock_synthesize = cls._patches.enter_context(patch.object(DocumentSynthesizer, 'synthesize_async'))
+
         # Mock the crawler results
-        mock_crawl.return_value = [{"url": "https://example.com", "title": "Example", "content": {"text": "Test content"}}]
-        
+        cls.mock_crawl.return_value = [{"url": "https://example.com", "title": "Example", "content": {"text": "Test content"}}]
+
         # Mock the analyzer results
-        mock_analyze.return_value = mock_crawl.return_value
-        
+        cls.mock_analyze.return_value = cls.mock_crawl.return_value
+
         # Mock the synthesizer results
-        mock_synthesize.return_value = [{"id": "doc_1", "title": "Example", "content": "Test content"}]
-        
+        cls.mock_synthesize.return_value = [{"id": "doc_1", "title": "Example", "content": "Test content"}]
+
+        cls.client = RufusClient(api_key="fake_key")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._patches.close()
+
+    def setUp(self):
+        for mock in (self.mock_crawl, self.mock_analyze, self.mock_synthesize):
+            mock.reset_mock()
+
+    def test_scrape_flow(self):
         # Test the client
-        client = RufusClient(api_key="fake_key")
-        documents = client.scrape("https://example.com", "Test instructions")
-        
+        documents = asyncio.run(self.client.scrape("https://example.com", "Test instructions"))
+
         # Verify the flow
         self.assertEqual(len(documents), 1)
-        mock_crawl.assert_called_once()
-        mock_analyze.assert_called_once()
-        mock_synthesize.assert_called_once()
+        self.mock_crawl.assert_called_once()
+        self.mock_analyze.assert_called_once()
+        self.mock_synthesize.assert_called_once()
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
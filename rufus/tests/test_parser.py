@@ -2,10 +2,18 @@ import unittest
 from bs4 import BeautifulSoup
 from rufus.crawler.parser import HTMLParser
 
+try:
+    import lxml
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
 class TestHTMLParser(unittest.TestCase):
-    def setUp(self):
-        self.parser = HTMLParser()
-        self.html = """
+    @classmethod
+    def setUpClass(cls):
+        # The parser only reads the soup, so it is parsed once for all tests
+        cls.parser = HTMLParser()
+        cls.html = """
         <html>
             <head><title>Test Page</title></head>
             <body>
@@ -22,7 +30,7 @@ class TestHTMLParser(unittest.TestCase):
             </body>
         </html>
         """
-        self.soup = BeautifulSoup(self.html, 'html.parser')
+        cls.soup = BeautifulSoup(cls.html, PARSER)
     
     def test_extract_title(self):
         title = self.parser.extract_title(self.soup)
@@ -34,11 +42,20 @@ class TestHTMLParser(unittest.TestCase):
         self.assertTrue("This is a test paragraph." in content["paragraphs"])
         self.assertEqual(len(content["lists"]), 1)
     
+    def test_extract_tables(self):
+        soup = BeautifulSoup("<table><thead><tr><th>Name</th></tr></thead><tbody><tr><td>Rufus</td></tr></tbody></table>", PARSER)
+        content = self.parser.extract_content(soup)
+        self.assertEqual(content["tables"], [{"headers": ["Name"], "rows": [["Rufus"]]}])
+    
     def test_extract_links(self):
         links = self.parser.extract_links(self.soup, "https://example.com")
         self.assertEqual(len(links), 2)
         self.assertTrue("https://example.com/link1" in links)
         self.assertTrue("https://example.com/link2" in links)
 
+    def test_extract_links_from_html(self):
+        links = self.parser.extract_links_from_html(self.html, "https://example.com")
+        self.assertEqual(links, ["https://example.com/link1", "https://example.com/link2"])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,142 @@
+import asyncio
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+from rufus.utils.config import Config
+from rufus.synthesizer.document import DocumentSynthesizer
+
+def make_pages(domain, count=2):
+    return [
+        {"url": f"https://{domain}/{i}", "title": f"Page {i}", "content": {"text": f"Content of page {i} on {domain}"}, "metadata": {}}
+        for i in range(count)
+    ]
+
+def make_response(content):
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content=content))]
+    return response
+
+class TestDocumentSynthesizer(unittest.TestCase):
+    def make_synthesizer(self, **settings):
+        config = Config({"group_by_domain": True, "stream_llm_responses": False, **settings})
+        synthesizer = DocumentSynthesizer(config)
+        synthesizer.client = MagicMock()
+        synthesizer.client.chat.completions.create = AsyncMock(return_value=make_response('{"title": "Synthesized"}'))
+        synthesizer._get_client = lambda: synthesizer.client
+        return synthesizer
+
+    def test_synthesize_inside_event_loop(self):
+        # The blocking wrapper also works when the caller already runs an event loop
+        synthesizer = self.make_synthesizer()
+
+        async def call():
+            return synthesizer.synthesize(make_pages("example.com"))
+
+        documents = asyncio.run(call())
+        self.assertEqual(documents[0]["content"]["synthesized"], {"title": "Synthesized"})
+
+    def test_synthesize_cached(self):
+        # A group synthesized before is served from the cache without another LLM call
+        synthesizer = self.make_synthesizer(use_llm_cache=True, llm_cache_backend="memory")
+        pages = make_pages("example.com")
+
+        first = asyncio.run(synthesizer.synthesize_async(pages))
+        second = asyncio.run(synthesizer.synthesize_async(pages))
+        self.assertEqual(synthesizer.client.chat.completions.create.call_count, 1)
+        self.assertEqual(first[0]["content"]["synthesized"], {"title": "Synthesized"})
+        self.assertEqual(second[0]["content"]["synthesized"], {"title": "Synthesized"})
+
+    def test_failed_synthesis_not_cached(self):
+        # A failed synthesis is retried on the next run instead of being served from the cache
+        synthesizer = self.make_synthesizer(use_llm_cache=True, llm_cache_backend="memory")
+        synthesizer.client.chat.completions.create.side_effect = [RuntimeError("API down"), make_response('{"title": "Synthesized"}')]
+        pages = make_pages("example.com")
+
+        first = asyncio.run(synthesizer.synthesize_async(pages))
+        second = asyncio.run(synthesizer.synthesize_async(pages))
+        self.assertIn("error", first[0]["content"]["synthesized"])
+        self.assertEqual(second[0]["content"]["synthesized"], {"title": "Synthesized"})
+        self.assertEqual(synthesizer.client.chat.completions.create.call_count, 2)
+
+    @patch('rufus.synthesizer.document.run_batch', new_callable=AsyncMock)
+    def test_synthesize_batch(self, mock_run_batch):
+        # Responses are joined back to their groups by custom_id, missing ones become errors
+        synthesizer = self.make_synthesizer(use_batch_api=True, batch_api_min_groups=2)
+        mock_run_batch.return_value = {
+            "b.com": {"choices": [{"message": {"content": '{"title": "B"}'}}]}
+        }
+
+        documents = asyncio.run(synthesizer.synthesize_async(make_pages("a.com") + make_pages("b.com")))
+        requests = mock_run_batch.call_args[0][1]
+        self.assertEqual([request["custom_id"] for request in requests], ["a.com", "b.com"])
+        synthesized = {document["id"]: document["content"]["synthesized"] for document in documents}
+        self.assertEqual(synthesized["b.com"], {"title": "B"})
+        self.assertIn("error", synthesized["a.com"])
+        synthesizer.client.chat.completions.create.assert_not_called()
+
+    @patch('rufus.synthesizer.document.run_batch', new_callable=AsyncMock)
+    def test_small_synthesis_stays_online(self, mock_run_batch):
+        synthesizer = self.make_synthesizer(use_batch_api=True, batch_api_min_groups=2)
+
+        asyncio.run(synthesizer.synthesize_async(make_pages("a.com")))
+        mock_run_batch.assert_not_called()
+        self.assertEqual(synthesizer.client.chat.completions.create.call_count, 1)
+
+    def test_stream_synthesis(self):
+        # Prose before the JSON object is dropped as the stream arrives
+        synthesizer = self.make_synthesizer(stream_llm_responses=True)
+        stream = MagicMock()
+        stream.__aiter__.return_value = [
+            MagicMock(choices=[MagicMock(delta=MagicMock(content=delta))])
+            for delta in ["Sure, here it is: ", '{"title": ', '"Streamed"}']
+        ]
+        stream.close = AsyncMock()
+        synthesizer.client.chat.completions.create = AsyncMock(return_value=stream)
+
+        documents = asyncio.run(synthesizer.synthesize_async(make_pages("example.com")))
+        self.assertTrue(synthesizer.client.chat.completions.create.call_args.kwargs["stream"])
+        self.assertEqual(documents[0]["content"]["synthesized"], {"title": "Streamed"})
+        stream.close.assert_awaited_once()
+
+    def test_prepare_content_drops_repeated_lines(self):
+        synthesizer = self.make_synthesizer()
+        pages = [
+            {"url": "https://example.com/0", "title": "Page 0", "content": {"text": "Menu\nFirst page"}},
+            {"url": "https://example.com/1", "title": "Page 1", "content": {"text": "Menu\nSecond page"}}
+        ]
+
+        content = synthesizer._prepare_content(pages)
+        self.assertEqual(content.count("Menu"), 1)
+        self.assertIn("Second page", content)
+
+    def test_parse_synthesis_fallbacks(self):
+        synthesizer = self.make_synthesizer()
+        self.assertEqual(synthesizer._parse_synthesis('{"title": "Bare"}'), {"title": "Bare"})
+        self.assertEqual(synthesizer._parse_synthesis('```json\n{"title": "Fenced"}\n```'), {"title": "Fenced"})
+        self.assertEqual(synthesizer._parse_synthesis('Result: {"title": "First"} and {not json}'), {"title": "First"})
+        self.assertIn("error", synthesizer._parse_synthesis("No JSON here"))
+
+    def test_client_of_previous_loop_closed(self):
+        # Replacing the client of an idle event loop closes its connections
+        synthesizer = DocumentSynthesizer(Config({}))
+        synthesizer.api_key = "fake_api_key"
+
+        async def get_client():
+            return synthesizer._get_client()
+
+        async def replace_client():
+            client = synthesizer._get_client()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return client
+
+        loop = asyncio.new_event_loop()
+        try:
+            old = loop.run_until_complete(get_client())
+            new = asyncio.run(replace_client())
+        finally:
+            loop.close()
+        self.assertIsNot(old, new)
+        self.assertTrue(old.is_closed())
+
+if __name__ == "__main__":
+    unittest.main()
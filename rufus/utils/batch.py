@@ -0,0 +1,101 @@
+import logging
+import asyncio
+import orjson
+from typing import List, Dict, Any, Optional
+
+from .error import APIError
+
+# Terminal states of an OpenAI batch job
+BATCH_FINAL_STATES = {'completed', 'failed', 'expired', 'cancelled'}
+
+def build_batch_file(requests: List[Dict[str, Any]], endpoint: str = "/v1/chat/completions") -> bytes:
+    """
+    Build the JSONL input file for an OpenAI batch job.
+
+    Args:
+        requests: List of dictionaries with a unique 'custom_id' and the request 'body'
+        endpoint: API endpoint the requests are sent to
+
+    Returns:
+        JSONL-encoded batch input
+    """
+    lines = [
+        orjson.dumps({
+            'custom_id': request['custom_id'],
+            'method': 'POST',
+            'url': endpoint,
+            'body': request['body']
+        })
+        for request in requests
+    ]
+    return b'\n'.join(lines) + b'\n'
+
+def parse_batch_output(output: str) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Parse the JSONL output file of an OpenAI batch job.
+
+    Args:
+        output: Content of the batch output file
+
+    Returns:
+        Dictionary mapping each custom_id to its response body, or None if the request failed
+    """
+    logger = logging.getLogger("rufus.batch")
+    results = {}
+
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+
+        entry = orjson.loads(line)
+        response = entry.get('response') or {}
+
+        if entry.get('error') or response.get('status_code') != 200:
+            logger.warning(f"Batch request {entry.get('custom_id')} failed: {entry.get('error')}")
+            results[entry.get('custom_id')] = None
+        else:
+            results[entry.get('custom_id')] = response.get('body')
+
+    return results
+
+async def run_batch(client: Any, requests: List[Dict[str, Any]], endpoint: str = "/v1/chat/completions",
+                    completion_window: str = "24h", poll_interval: float = 30) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Submit requests as a single OpenAI batch job and wait for the results.
+
+    Args:
+        client: AsyncOpenAI client
+        requests: List of dictionaries with a unique 'custom_id' and the request 'body'
+        endpoint: API endpoint the requests are sent to
+        completion_window: Time frame within which the batch should be processed
+        poll_interval: Seconds to wait between status checks
+
+    Returns:
+        Dictionary mapping each custom_id to its response body, or None if the request failed
+    """
+    logger = logging.getLogger("rufus.batch")
+
+    if not requests:
+        return {}
+
+    input_file = await client.files.create(
+        file=("rufus_batch.jsonl", build_batch_file(requests, endpoint)),
+        purpose="batch"
+    )
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=endpoint,
+        completion_window=completion_window
+    )
+    logger.info(f"Submitted batch {batch.id} with {len(requests)} requests")
+
+    while batch.status not in BATCH_FINAL_STATES:
+        await asyncio.sleep(poll_interval)
+        batch = await client.batches.retrieve(batch.id)
+        logger.debug(f"Batch {batch.id} status: {batch.status}")
+
+    if batch.status != 'completed' or not batch.output_file_id:
+        raise APIError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+    output = await client.files.content(batch.output_file_id)
+    return parse_batch_output(output.text)
@@ -0,0 +1,280 @@
+import logging
+import os
+import json
+import time
+import hashlib
+import asyncio
+import orjson
+from typing import Any, List, Optional
+
+class ResultCache:
+    """
+    Exact-match key-value cache for LLM results.
+    
+    Uses Redis when available, falls back to diskcache and finally to an
+    in-process dictionary. Values are stored as JSON.
+    """
+
+    def __init__(self, config: Any, namespace: str = "rufus"):
+        """
+        Initialize the cache.
+        
+        Args:
+            config: Configuration settings
+            namespace: Prefix for all keys written by this cache
+        """
+        self.config = config
+        self.logger = logging.getLogger("rufus.cache")
+        self.namespace = namespace
+        self.ttl = self.config.get('llm_cache_ttl', 86400)
+        self.backend = None
+        self._store = None
+        self._store_loop = None
+        self._redis_checked = False
+        
+        backend = self.config.get('llm_cache_backend', 'redis')
+        if backend == 'redis':
+            self._setup_redis() or self._setup_diskcache() or self._setup_memory()
+        elif backend == 'diskcache':
+            self._setup_diskcache() or self._setup_memory()
+        else:
+            self._setup_memory()
+        
+        self.logger.info(f"Using {self.backend} LLM cache")
+
+    def _setup_redis(self) -> bool:
+        """Set up the Redis backend."""
+        try:
+            import redis.asyncio as redis
+            
+            # The client is created per event loop by _redis, as its connections are bound to a loop
+            self._redis_class = redis.Redis
+            self.backend = 'redis'
+            return True
+        except ImportError:
+            self.logger.debug("redis not installed. Install with: pip install redis")
+            return False
+
+    def _setup_diskcache(self) -> bool:
+        """Set up the diskcache backend."""
+        try:
+            import diskcache
+            
+            self._store = diskcache.Cache(self.config.get('cache_dir', '.rufus_cache'))
+            self.backend = 'diskcache'
+            return True
+        except ImportError:
+            self.logger.debug("diskcache not installed. Install with: pip install diskcache")
+            return False
+
+    def _setup_memory(self) -> bool:
+        """Set up the in-process backend."""
+        self._store = {}
+        self.backend = 'memory'
+        return True
+
+    def _redis(self) -> Any:
+        """
+        Get the Redis client of the running event loop, creating it on first use.
+        
+        Returns:
+            redis.asyncio client whose connection pool belongs to the running loop
+        """
+        loop = asyncio.get_running_loop()
+        
+        if self._store is None or self._store_loop is not loop:
+            # The connections of an earlier loop cannot be reused, they are released with the old client
+            self._store = self._redis_class.from_url(self.config.get('redis_url', 'redis://localhost:6379/0'))
+            self._store_loop = loop
+        
+        return self._store
+    
+    async def _check_redis(self) -> None:
+        """
+        Ping the Redis server on first use and fall back to diskcache or memory if it is unreachable,
+        as an installed redis package says nothing about a running server.
+        """
+        if self.backend != 'redis' or self._redis_checked:
+            return
+        
+        try:
+            await asyncio.wait_for(self._redis().ping(), timeout=self.config.get('redis_connect_timeout', 2))
+            self._redis_checked = True
+        except Exception as e:
+            # Concurrent first calls may all fail, only the first one switches the backend
+            if self.backend != 'redis':
+                return
+            self.logger.warning(f"Redis cache unreachable, falling back: {str(e)}")
+            store = self._store
+            self._store = None
+            self._store_loop = None
+            self._setup_diskcache() or self._setup_memory()
+            self.logger.info(f"Using {self.backend} LLM cache")
+            
+            # redis 5 renamed close() to aclose()
+            close = getattr(store, 'aclose', None) or store.close
+            try:
+                await close()
+            except Exception:
+                pass
+    
+    async def aclose(self) -> None:
+        """Close the Redis connections of the running event loop, if any."""
+        if self.backend == 'redis' and self._store is not None:
+            if self._store_loop is asyncio.get_running_loop():
+                # redis 5 renamed close() to aclose()
+                close = getattr(self._store, 'aclose', None) or self._store.close
+                try:
+                    await close()
+                except Exception as e:
+                    self.logger.warning(f"Error closing the redis cache: {str(e)}")
+            self._store = None
+            self._store_loop = None
+    
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Build a cache key from the given parts.
+        
+        Args:
+            parts: Values identifying the cached result
+        
+        Returns:
+            SHA-256 hex digest of the parts
+        """
+        return hashlib.sha256("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Get a cached value.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            The cached value, or None on a miss
+        """
+        key = f"{self.namespace}:{key}"
+        await self._check_redis()
+        
+        try:
+            if self.backend == 'redis':
+                value = await self._redis().get(key)
+            elif self.backend == 'diskcache':
+                value = self._store.get(key)
+            else:
+                expires_at, value = self._store.get(key, (0, None))
+                if expires_at < time.time():
+                    self._store.pop(key, None)
+                    value = None
+        except Exception as e:
+            self.logger.warning(f"Error reading from {self.backend} cache: {str(e)}")
+            return None
+        
+        return orjson.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Any) -> None:
+        """
+        Store a value in the cache.
+        
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+        """
+        key = f"{self.namespace}:{key}"
+        value = orjson.dumps(value)
+        await self._check_redis()
+        
+        try:
+            if self.backend == 'redis':
+                await self._redis().setex(key, self.ttl, value)
+            elif self.backend == 'diskcache':
+                self._store.set(key, value, expire=self.ttl)
+            else:
+                self._store[key] = (time.time() + self.ttl, value)
+        except Exception as e:
+            self.logger.warning(f"Error writing to {self.backend} cache: {str(e)}")
+
+class SemanticCache:
+    """
+    Similarity cache for LLM results keyed by normalized embedding vectors.
+    
+    Uses a FAISS HNSW index with inner product, which equals cosine similarity
+    for L2-normalized vectors. The index can be persisted between runs.
+    """
+
+    def __init__(self, config: Any, dimension: int, path: Optional[str] = None):
+        """
+        Initialize the cache.
+        
+        Args:
+            config: Configuration settings
+            dimension: Dimension of the embedding vectors
+            path: Optional file to load the index from and save it to
+        """
+        self.config = config
+        self.logger = logging.getLogger("rufus.cache")
+        self.threshold = self.config.get('semantic_cache_threshold', 0.95)
+        self.path = path
+        
+        try:
+            import faiss
+        except ImportError:
+            self.logger.error("faiss not installed. Please install with: pip install faiss-cpu")
+            raise
+        
+        self._faiss = faiss
+        self.values = []
+        
+        if self.path and os.path.exists(self.path):
+            self.index = faiss.read_index(self.path)
+            with open(f"{self.path}.json", "r", encoding="utf-8") as f:
+                self.values = json.load(f)
+            self.logger.info(f"Loaded semantic cache with {len(self.values)} entries from {self.path}")
+        else:
+            self.index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+
+    def lookup(self, vectors: Any) -> List[Optional[Any]]:
+        """
+        Find cached values for the given vectors.
+        
+        Args:
+            vectors: NumPy array of L2-normalized vectors, one per row
+        
+        Returns:
+            List with the cached value of the most similar entry for each vector,
+            or None where the similarity is below the threshold
+        """
+        if not self.values:
+            return [None] * len(vectors)
+        
+        similarities, ids = self.index.search(vectors, 1)
+        
+        return [
+            self.values[idx[0]] if idx[0] >= 0 and similarity[0] >= self.threshold else None
+            for similarity, idx in zip(similarities, ids)
+        ]
+
+    def add(self, vectors: Any, values: List[Any]) -> None:
+        """
+        Add entries to the cache.
+        
+        Args:
+            vectors: NumPy array of L2-normalized vectors, one per row
+            values: JSON-serializable value for each vector
+        """
+        self.index.add(vectors)
+        self.values.extend(values)
+
+    def save(self) -> None:
+        """Persist the index and its values if a path is configured."""
+        if not self.path:
+            return
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._faiss.write_index(self.index, self.path)
+        with open(f"{self.path}.json", "w", encoding="utf-8") as f:
+            json.dump(self.values, f)
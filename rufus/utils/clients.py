@@ -0,0 +1,42 @@
+import logging
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+# Close tasks in flight, referenced until they finish so they are not garbage collected
+_CLOSING = set()
+
+def retire_client(close: Callable[[], Awaitable[Any]], loop: Optional[asyncio.AbstractEventLoop], name: str) -> None:
+    """
+    Close a client whose connections belong to another event loop, without waiting for it.
+
+    The client is closed on its own loop when that loop is running in another thread,
+    and on the running loop otherwise. The connections of a closed loop cannot be
+    closed cleanly any more and are released when the client is garbage collected.
+
+    Args:
+        close: Coroutine function closing the client
+        loop: Event loop the client was created on
+        name: Name of the client, for logging
+    """
+    logger = logging.getLogger("rufus.clients")
+
+    async def run() -> None:
+        try:
+            await close()
+        except RuntimeError as e:
+            # Raised when the connections died with their event loop
+            logger.debug(f"Could not close the {name} of a previous event loop: {str(e)}")
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if loop is not None and loop is not running and loop.is_running() and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(run(), loop)
+    elif running is not None:
+        task = running.create_task(run())
+        _CLOSING.add(task)
+        task.add_done_callback(_CLOSING.discard)
+    else:
+        logger.debug(f"Dropping the {name} of a previous event loop")
@@ -1,7 +1,81 @@
 import logging
 import os
-import json
-from typing import Dict, Any, Optional
+import sys
+import re
+import copy
+import functools
+import orjson
+from typing import Dict, Any, Iterable, Optional, Pattern, Tuple
+
+# Spellings of boolean environment values
+_TRUE = frozenset(('true', 'yes', '1'))
+_FALSE = frozenset(('false', 'no', '0'))
+
+# Decimal numbers such as 1.5, 1. or .5
+_FLOAT_RE = re.compile(r'(?:\d+\.\d*|\.\d+)', re.ASCII).fullmatch
+
+# Accepted log_level names, other names fall back to INFO
+LOG_LEVELS = {
+    name: getattr(logging, name)
+    for name in ("NOTSET", "DEBUG", "INFO", "WARN", "WARNING", "ERROR", "FATAL", "CRITICAL")
+}
+
+# Settings that require logging to be reconfigured
+LOG_SETTINGS = frozenset(("log_level", "log_format"))
+
+# Settings the URL matchers are compiled from
+MATCHER_SETTINGS = ("skip_extensions", "ignore_patterns")
+
+@functools.lru_cache(maxsize=64)
+def _parse_json_env(value: str) -> Any:
+    """Parse a JSON environment value, cached as the same values are read again and again."""
+    return orjson.loads(value)
+
+# Parsed RUFUS_* environment variables, keyed by the raw items they were parsed from
+_ENV_CACHE = {}
+
+def _parse_rufus_env() -> Dict[str, Any]:
+    """
+    Parse the RUFUS_* environment variables into configuration values.
+    
+    The result is cached and only parsed again when the RUFUS_* variables change.
+    
+    Returns:
+        Dictionary of configuration keys and their typed values
+    """
+    items = frozenset((key, value) for key, value in os.environ.items() if key.startswith("RUFUS_"))
+    
+    parsed = _ENV_CACHE.get(items)
+    if parsed is None:
+        parsed = {}
+        for key, value in items:
+            # Keys built at runtime are not interned like the literal keys of the defaults
+            config_key = sys.intern(key[6:].lower())
+            lowered = value.lower()
+            
+            # Handle different types of values
+            if lowered in _TRUE:
+                parsed[config_key] = True
+            elif lowered in _FALSE:
+                parsed[config_key] = False
+            elif value.isdigit():
+                parsed[config_key] = int(value)
+            elif _FLOAT_RE(value):
+                parsed[config_key] = float(value)
+            elif value[:1] in ('[', '{'):
+                try:
+                    parsed[config_key] = _parse_json_env(value)
+                except orjson.JSONDecodeError:
+                    parsed[config_key] = value
+            else:
+                parsed[config_key] = value
+        
+        # Only the current environment is kept
+        _ENV_CACHE.clear()
+        _ENV_CACHE[items] = parsed
+    
+    # Copy lists and dictionaries so one Config cannot change another
+    return {key: copy.deepcopy(value) if isinstance(value, (list, dict)) else value for key, value in parsed.items()}
 
 class Config:
     """
@@ -9,6 +83,8 @@ class Config:
     
     This class manages configuration settings for the Rufus web crawler, content analyzer,
     and document synthesizer. It provides defaults and allows for customization.
+    Settings can be read with get() or indexing, and every default setting also as
+    an attribute, e.g. config.user_agent.
     """
     
     # Default configuration settings
@@ -20,14 +96,26 @@ class Config:
         # Crawler settings
         "user_agent": "Rufus/1.0 (https://github.com/sabdulrahman/rufus)",
         "request_timeout": 10,
-        "crawl_delay": 1,
+        "max_page_bytes": 5000000,  # larger response bodies are truncated
+        "dedupe_pages": True,  # skip pages whose body matches one already crawled
+        "parse_workers": None,  # threads parsing pages during async crawls, defaults to the CPU count
+        "crawl_delay": 1,  # seconds per window of the per-host rate limit, 0 disables it
+        "per_host_rate": None,  # requests per host per crawl_delay, defaults to max_concurrent_requests
         "max_concurrent_requests": 5,
-        "batch_size": 5,
+        "max_connections": 200,  # connections kept by the crawler HTTP session
+        "max_per_host": 20,  # connections per host
+        "dns_cache_ttl": 300,  # seconds
         "save_html": False,
         "stay_in_domain": True,
         "skip_extensions": [".pdf", ".jpg", ".png", ".gif", ".zip", ".exe"],
         "ignore_patterns": ["login", "signup", "cart", "checkout", "account"],
         "async_crawling": True,
+        "use_uvloop": True,  # use uvloop for new event loops when it is installed
+        "use_bloom_filter": False,  # track visited URLs in a Bloom filter, needs pybloom-live
+        "bloom_initial_capacity": 10000,
+        "bloom_error_rate": 1e-6,
+        "html_parser": "lxml",  # BeautifulSoup parser, "html.parser" needs no extra dependency
+        "xpath_links": True,  # read links from the raw HTML with selectolax or lxml instead of the soup
         
         # Content analyzer settings
         "llm_provider": "openai",
@@ -36,24 +124,65 @@ class Config:
         "chunk_relevance_threshold": 0.5,
         "max_chunk_length": 4000,
         "extract_relevant_only": True,
+        "max_output_pages": None,  # keep only the most relevant pages, None keeps all
+        "max_chunks_per_request": 4,  # chunks sent to the LLM in a single request
+        "max_tokens_per_chunk": 500,
+        "max_concurrent_llm": 16,  # LLM requests in flight at once
+        "http_pool": 100,  # connections kept by the LLM HTTP client
+        "http_keepalive": 50,  # idle connections kept alive between LLM requests
+        "llm_timeout": 60.0,  # seconds
+        "stream_llm_responses": True,  # stop generating once no chunk passes the threshold
+        "analyze_workers": 16,  # threads splitting and embedding page text during analysis
+        "use_batch_api": False,  # route large non-interactive crawls through the OpenAI Batch API
+        "batch_api_min_pages": 20,  # smaller crawls keep using the online path
+        "batch_api_min_groups": 10,  # fewer document groups are synthesized online
+        "batch_poll_interval": 30,  # seconds between batch status checks
+        "use_llm_cache": False,  # cache LLM results keyed by prompt, model and temperature
+        "llm_cache_backend": "redis",  # or "diskcache", "memory"; falls back when not installed or unreachable
+        "llm_cache_ttl": 86400,  # seconds
+        "redis_url": "redis://localhost:6379/0",
+        "redis_connect_timeout": 2,  # seconds to wait for the first ping before falling back
+        "cache_dir": ".rufus_cache",
+        "use_semantic_cache": False,  # reuse results of near-duplicate chunks, needs sentence-transformers and faiss
+        "semantic_cache_threshold": 0.95,  # minimum cosine similarity for a hit
+        "semantic_cache_path": None,  # file to persist the index between runs
+        "embedding_model": "sentence-transformers/all-MiniLM-L6-v2",
+        "embedding_backend": "torch",  # or "onnx" to run onnx_model_path with ONNX Runtime
+        "onnx_model_path": None,  # exported, optionally INT8-quantized, ONNX embedding model
+        "embedding_batch_size": 32,
+        "use_embedding_prefilter": False,  # skip chunks dissimilar to the instructions before calling the LLM
+        "embed_prefilter_threshold": 0.25,  # minimum cosine similarity to the instructions
         
         # Document synthesizer settings
         "use_llm_for_synthesis": True,
         "group_by_domain": False,
         "group_by_topic": False,
         "max_synthesis_chars_per_page": 3000,
+        "max_synthesis_tokens": 2000,  # upper bound, smaller inputs get a proportionally smaller limit
+        "small_model": "gpt-4o-mini",  # used for groups of two pages or small_model_max_chars of content
+        "small_model_max_chars": 4000,
+        "min_synthesis_chars": 0,  # groups with less content are not synthesized with the LLM
+        "dedupe_synthesis_lines": True,  # leave out lines already sent with an earlier page of the group
+        "synthesis_cache_path": None,  # file to persist the semantic cache of syntheses, used with use_semantic_cache
 
         #Browser settings
         "use_browser": False,
         "browser_type": "playwright",  # or "selenium"
         "playwright_browser": "chromium",  # or "firefox", "webkit"
-        "playwright_wait_until": "networkidle",  # or "load", "domcontentloaded"
+        "playwright_wait_until": "domcontentloaded",  # or "load", "networkidle"
         "browser_timeout": 30000,  # milliseconds
         "browser_wait_time": 0,  # additional seconds to wait after load
         "browser_wait_for_selector": "body",  # optional selector to wait for
-        "browser_slow_mo": 50  # slow down browser operations by ms        
+        "browser_slow_mo": 50,  # slow down browser operations by ms
+        "block_resources": True,  # skip images, fonts, media and stylesheets
+        "browser_pool_size": 8,  # pages reused across URLs
+        "browser_concurrency": 8  # pages loading at the same time
     }
     
+    # Every default setting is also a slotted attribute of the same name,
+    # next to the settings dictionary and the compiled URL matchers
+    __slots__ = ("config", "logger", "_skip_extensions", "_ignore_re") + tuple(DEFAULT_CONFIG)
+    
     def __init__(self, custom_config: Optional[Dict[str, Any]] = None):
         """
         Initialize the configuration with defaults and custom settings.
@@ -64,7 +193,7 @@ class Config:
         self.logger = logging.getLogger("rufus.config")
         
         # Start with default config
-        self.config = self.DEFAULT_CONFIG.copy()
+        self.config = dict(_DEFAULT_CONFIG_FROZEN)
         
         # Load from environment variables
         self._load_from_env()
@@ -73,7 +202,9 @@ class Config:
         if custom_config:
             self.update(custom_config)
         
-        # Configure logging
+        # Bind hot settings, compile the URL matchers and configure logging
+        self._bind_settings()
+        self._compile_matchers()
         self._configure_logging()
         
         self.logger.debug("Configuration initialized")
@@ -83,34 +214,78 @@ class Config:
         Load configuration from environment variables.
         Environment variables should be prefixed with RUFUS_.
         """
-        for key, value in os.environ.items():
-            if key.startswith("RUFUS_"):
-                config_key = key[6:].lower()
-                
-                # Handle different types of values
-                if value.lower() in ('true', 'yes', '1'):
-                    self.config[config_key] = True
-                elif value.lower() in ('false', 'no', '0'):
-                    self.config[config_key] = False
-                elif value.isdigit():
-                    self.config[config_key] = int(value)
-                elif value.replace('.', '', 1).isdigit():
-                    self.config[config_key] = float(value)
-                elif value.startswith('[') or value.startswith('{'):
-                    try:
-                        self.config[config_key] = json.loads(value)
-                    except json.JSONDecodeError:
-                        self.config[config_key] = value
-                else:
-                    self.config[config_key] = value
-    
-    def _configure_logging(self) -> None:
-        """Configure logging based on the current configuration."""
+        self.config.update(_parse_rufus_env())
+    
+    def _bind_settings(self, keys: Optional[Iterable[str]] = None) -> None:
+        """
+        Copy settings into their attributes, so reading them skips the get() call.
+        
+        Args:
+            keys: Settings to copy, defaults to every default setting
+        """
+        config = self.config
+        for key in self.DEFAULT_CONFIG if keys is None else keys:
+            if key in self.DEFAULT_CONFIG:
+                setattr(self, key, config.get(key))
+    
+    @staticmethod
+    def compile_url_matchers(skip_extensions: Iterable[str], ignore_patterns: Iterable[str]) -> Tuple[Tuple[str, ...], Optional[Pattern]]:
+        """
+        Compile the rules for URLs that should not be crawled.
+        
+        Args:
+            skip_extensions: File extensions to skip
+            ignore_patterns: Substrings of URLs to skip
+        
+        Returns:
+            Tuple of the extensions, for a single str.endswith call, and one regex
+            matching any of the patterns, or None if there are no patterns
+        """
+        ignore_patterns = list(ignore_patterns or ())
+        ignore_re = re.compile('|'.join(re.escape(pattern) for pattern in ignore_patterns)) if ignore_patterns else None
+        return tuple(skip_extensions or ()), ignore_re
+    
+    def _compile_matchers(self) -> None:
+        """Compile skip_extensions and ignore_patterns for should_skip_url."""
+        self._skip_extensions, self._ignore_re = self.compile_url_matchers(
+            self.config.get('skip_extensions', ()), self.config.get('ignore_patterns', ())
+        )
+    
+    def should_skip_url(self, url: str) -> bool:
+        """
+        Check whether a URL has a skipped extension or contains an ignore pattern.
+        
+        Args:
+            url: URL to check
+        
+        Returns:
+            True if the URL should not be crawled
+        """
+        if self._skip_extensions and url.endswith(self._skip_extensions):
+            return True
+        return self._ignore_re is not None and self._ignore_re.search(url) is not None
+    
+    def _configure_logging(self, reconfigure: bool = False) -> None:
+        """
+        Configure logging based on the current configuration.
+        
+        Args:
+            reconfigure: Apply the level and format to an already configured root logger,
+                which logging.basicConfig silently leaves untouched
+        """
         log_level_name = self.config.get('log_level', 'INFO')
         log_format = self.config.get('log_format', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         
         # Convert string log level to numeric value
-        log_level = getattr(logging, log_level_name.upper(), logging.INFO)
+        log_level = LOG_LEVELS.get(log_level_name.upper(), logging.INFO)
+        
+        root = logging.getLogger()
+        if reconfigure and root.handlers:
+            root.setLevel(log_level)
+            formatter = logging.Formatter(log_format)
+            for handler in root.handlers:
+                handler.setFormatter(formatter)
+            return
         
         # Configure root logger
         logging.basicConfig(
@@ -126,10 +301,13 @@ class Config:
             new_config: New configuration settings to apply
         """
         self.config.update(new_config)
+        self._bind_settings(new_config)
+        if any(key in new_config for key in MATCHER_SETTINGS):
+            self._compile_matchers()
         
         # Reconfigure logging if log level or format changed
-        if 'log_level' in new_config or 'log_format' in new_config:
-            self._configure_logging()
+        if not LOG_SETTINGS.isdisjoint(new_config):
+            self._configure_logging(reconfigure=True)
             
         self.logger.debug("Configuration updated")
     
@@ -170,6 +348,10 @@ class Config:
             value: Configuration value
         """
         self.config[key] = value
+        if key in self.DEFAULT_CONFIG:
+            setattr(self, key, value)
+        if key in MATCHER_SETTINGS:
+            self._compile_matchers()
     
     def as_dict(self) -> Dict[str, Any]:
         """
@@ -178,4 +360,22 @@ class Config:
         Returns:
             Dictionary of configuration settings
         """
-        return self.config.copy()
\ No newline at end of file
+        return self.config.copy()
+    
+    def evolve(self, **changes: Any) -> "Config":
+        """
+        Create a new configuration with some settings changed, leaving this one untouched.
+        
+        Args:
+            changes: Settings to change
+            
+        Returns:
+            New Config with the current settings and the changes applied
+        """
+        return Config({**self.config, **changes})
+
+# Defaults copied into each Config, with list values as tuples so instances share no mutable state
+_DEFAULT_CONFIG_FROZEN = {
+    sys.intern(key): tuple(value) if isinstance(value, list) else value
+    for key, value in Config.DEFAULT_CONFIG.items()
+}
@@ -1,11 +1,13 @@
 import logging
+import asyncio
 import functools
-import traceback
 from typing import Callable, Any
 
 class RufusError(Exception):
     """Base exception for all Rufus-related errors."""
     
+    __slots__ = ("message", "code")
+    
     def __init__(self, message: str, code: str = None):
         """
         Initialize the error.
@@ -17,26 +19,31 @@ class RufusError(Exception):
         self.message = message
         self.code = code
         super().__init__(message)
+    
+    def __reduce__(self):
+        # Slots are not part of the default exception pickle state
+        return type(self), (self.message, self.code)
 
 class CrawlerError(RufusError):
     """Exception raised during web crawling."""
-    pass
+    __slots__ = ()
 
 class AnalysisError(RufusError):
     """Exception raised during content analysis."""
-    pass
+    __slots__ = ()
 
 class SynthesisError(RufusError):
     """Exception raised during document synthesis."""
-    pass
+    __slots__ = ()
 
 class APIError(RufusError):
     """Exception raised during API calls."""
-    pass
+    __slots__ = ()
 
 def handle_error(func: Callable) -> Callable:
     """
     Decorator for handling errors in Rufus functions.
+    Works for both regular functions and coroutine functions.
     
     Args:
         func: The function to decorate
@@ -44,33 +51,65 @@ def handle_error(func: Callable) -> Callable:
     Returns:
         Decorated function with error handling
     """
+    # Resolve the logger and the error class once, at decoration time
+    logger = logging.getLogger("rufus.error")
+    name = func.__name__
+    if "crawl" in name:
+        error_class, prefix = CrawlerError, "Error during web crawling"
+    elif "analyze" in name:
+        error_class, prefix = AnalysisError, "Error during content analysis"
+    elif "synthesize" in name:
+        error_class, prefix = SynthesisError, "Error during document synthesis"
+    else:
+        error_class, prefix = RufusError, "Unexpected error"
+    
+    def _handle(e: Exception) -> None:
+        if isinstance(e, RufusError):
+            # Log the error and re-raise
+            logger.error(f"{type(e).__name__}: {e.message}")
+            raise e
+        
+        # Log the unexpected error with traceback
+        logger.error(f"Unexpected error in {name}: {str(e)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            import traceback
+            logger.debug(traceback.format_exc())
+        
+        # Convert to RufusError and raise
+        raise error_class(f"{prefix}: {str(e)}")
+    
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs) -> Any:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                _handle(e)
+        
+        return async_wrapper
+    
     @functools.wraps(func)
     def wrapper(*args, **kwargs) -> Any:
-        logger = logging.getLogger("rufus.error")
-        
         try:
             return func(*args, **kwargs)
-        except RufusError as e:
-            # Log the error and re-raise
-            logger.error(f"{type(e).__name__}: {e.message}")
-            raise
         except Exception as e:
-            # Log the unexpected error with traceback
-            logger.error(f"Unexpected error in {func.__name__}: {str(e)}")
-            logger.debug(traceback.format_exc())
-            
-            # Convert to RufusError and raise
-            if "crawl" in func.__name__:
-                raise CrawlerError(f"Error during web crawling: {str(e)}")
-            elif "analyze" in func.__name__:
-                raise AnalysisError(f"Error during content analysis: {str(e)}")
-            elif "synthesize" in func.__name__:
-                raise SynthesisError(f"Error during document synthesis: {str(e)}")
-            else:
-                raise RufusError(f"Unexpected error: {str(e)}")
+            _handle(e)
     
     return wrapper
 
+# Messages longer than this are formatted without the cache
+MAX_CACHED_MESSAGE_LENGTH = 1024
+
+@functools.lru_cache(maxsize=256)
+def _format_error(error_type: str, message: str, code: str) -> tuple:
+    """Build the items of an error response, cached for repeated errors."""
+    return (
+        ("error", True),
+        ("error_type", error_type),
+        ("message", message),
+        ("error_code", code)
+    )
+
 def format_error_response(error: Exception) -> dict:
     """
     Format an exception into a standardized error response.
@@ -90,9 +129,13 @@ def format_error_response(error: Exception) -> dict:
         message = str(error)
         code = "unknown_error"
     
-    return {
-        "error": True,
-        "error_type": error_type,
-        "message": message,
-        "error_code": code
-    }
\ No newline at end of file
+    # Only short string messages and string codes are cached, other values may not be hashable
+    cacheable = (
+        isinstance(message, str) and len(message) <= MAX_CACHED_MESSAGE_LENGTH
+        and (code is None or isinstance(code, str))
+    )
+    if not cacheable:
+        return dict(_format_error.__wrapped__(error_type, message, code))
+    
+    # A fresh dictionary per call, so callers can modify it
+    return dict(_format_error(error_type, message, code))